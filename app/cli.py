@@ -0,0 +1,30 @@
+"""
+Command-line entry point.
+
+Installed as the ``data-dashboard`` console script; runs the Streamlit app
+from the installed package so no path setup is needed.
+"""
+
+import os
+import sys
+
+# Streamlit reads .streamlit/config.toml only from the working directory,
+# so the repo's settings are passed as flags; the user's own flags come
+# after them and take precedence
+CONFIG_FLAGS = (
+    "--server.headless=true",
+    "--server.port=8501",
+    "--server.enableCORS=false",
+    "--server.enableStaticServing=true",
+    "--browser.gatherUsageStats=false",
+    "--theme.base=dark",
+)
+
+
+def main():
+    """Launch ``streamlit run`` on the packaged main module."""
+    from streamlit.web import cli as stcli
+
+    script = os.path.join(os.path.dirname(__file__), "main.py")
+    sys.argv = ["streamlit", "run", script, *CONFIG_FLAGS, *sys.argv[1:]]
+    sys.exit(stcli.main())
@@ -4,57 +4,190 @@ Chat Interface Component
 Provides a conversational interface for querying slide content.
 """
 
+import html
+import numpy as np
 import streamlit as st
+from dataclasses import dataclass
 from typing import List, Dict, Any
 
+from ..services.embeddings import SlideHit
 from ..services.query_engine import QueryEngine
-from ..utils.translations import get_text
+from ..utils.translations import get_translations
+from .upload import get_embeddings_service
+
+# Cosine distance cut-offs between high / medium / low relevance
+_RELEVANCE_EDGES = np.array([0.25, 0.5], dtype=np.float32)
+
+# Bounds on what a session keeps: older turns are evicted, huge answers clipped
+MAX_MESSAGES = 100
+MAX_MESSAGE_CHARS = 16 * 1024
+
+# Raw messages sent to the LLM; older turns are folded into a short summary
+CHAT_HISTORY_MESSAGES = 10
+SUMMARY_TURNS = 20
+
+
+@dataclass(slots=True)
+class SourceSlide:
+    """A source slide as shown under an assistant message."""
+    slide_number: Any
+    title: str
+    distance: float
+    content_preview: str
+
+    @classmethod
+    def from_result(cls, slide: SlideHit) -> 'SourceSlide':
+        """Flatten a query engine search result."""
+        return cls(
+            slide_number=slide.slide_number,
+            title=slide.title,
+            distance=slide.distance,
+            content_preview=_preview(slide.content)
+        )
+
+
+@st.cache_resource(show_spinner=False)
+def get_query_engine() -> QueryEngine:
+    """Get the process-wide query engine (shared across sessions)."""
+    return QueryEngine(embeddings_service=get_embeddings_service())
 
 
 def initialize_chat_state():
     """Initialize chat-related session state."""
     if 'messages' not in st.session_state:
         st.session_state.messages = []
-    if 'query_engine' not in st.session_state:
-        st.session_state.query_engine = None
+    if 'chat_history' not in st.session_state:
+        # Role/content-only copy of the recent conversation, sent to the LLM
+        st.session_state.chat_history = []
+    if 'chat_summary' not in st.session_state:
+        # One line per turn that has dropped out of chat_history
+        st.session_state.chat_summary = ""
+
+
+def reset_chat():
+    """Clear the conversation."""
+    st.session_state.messages = []
+    st.session_state.chat_history = []
+    st.session_state.chat_summary = ""
 
 
 def render_chat_interface(lang: str = 'en'):
     """Render the chat interface for querying slides."""
     initialize_chat_state()
-    t = lambda key: get_text(key, lang)
+    t = get_translations(lang)
 
     # Check if embeddings are ready
     if not st.session_state.get('embeddings_ready', False):
-        st.info(t('chat_upload_first'))
+        st.info(t['chat_upload_first'])
         return
 
-    # Initialize query engine if needed
-    if st.session_state.query_engine is None:
-        try:
-            st.session_state.query_engine = QueryEngine()
-        except Exception as e:
-            st.warning(f"Running without AI features: {str(e)}")
-            st.session_state.query_engine = QueryEngine()
+    _render_history(lang)
+    _handle_input(lang)
+
+
+def _append_message(message: Dict[str, Any]):
+    """
+    Append a chat message, keeping the session's chat state bounded.
+
+    Evicts the oldest messages past MAX_MESSAGES and clips content longer
+    than MAX_MESSAGE_CHARS.
+
+    Args:
+        message: Message dict with 'role', 'content' and optional 'slides'
+    """
+    content = message["content"]
+    if len(content) > MAX_MESSAGE_CHARS:
+        message["content"] = content[:MAX_MESSAGE_CHARS] + "..."
+
+    messages = st.session_state.messages
+    messages.append(message)
+
+    overflow = len(messages) - MAX_MESSAGES
+    if overflow > 0:
+        del messages[:overflow]
+        # Keep the input fragment's index into the history in step
+        st.session_state._history_rendered = max(
+            0, st.session_state.get('_history_rendered', 0) - overflow
+        )
+
+
+def _record_turn(prompt: str, answer: str):
+    """
+    Add a turn to the LLM history, summarizing turns that fall out of it.
+
+    Only the last CHAT_HISTORY_MESSAGES stay verbatim; each older turn
+    becomes one templated line of chat_summary.
+
+    Args:
+        prompt: User message
+        answer: Assistant reply
+    """
+    history = st.session_state.chat_history
+    history.append({"role": "user", "content": prompt})
+    history.append({"role": "assistant", "content": answer})
+
+    if len(history) <= CHAT_HISTORY_MESSAGES:
+        return
+
+    overflow = len(history) - CHAT_HISTORY_MESSAGES
+    lines = [line for line in st.session_state.chat_summary.split("\n") if line]
+    for i in range(0, overflow - 1, 2):
+        asked, got = history[i]["content"], history[i + 1]["content"]
+        lines.append(f"User asked: {_clip(asked, 150)} | Answer: {_clip(got, 200)}")
+    del history[:overflow]
+
+    st.session_state.chat_summary = "\n".join(lines[-SUMMARY_TURNS:])
 
-    # Check for pending query
-    pending_query = st.session_state.pop('pending_query', None)
 
-    # Display chat history
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+def _clip(text: str, limit: int) -> str:
+    """Collapse whitespace and truncate text for the chat summary."""
+    text = " ".join(text.split())
+    return text[:limit] + "..." if len(text) > limit else text
 
-            # Show source slides for assistant messages
-            if message["role"] == "assistant" and message.get("slides"):
-                render_source_slides(message["slides"], lang)
+
+def _render_message(message: Dict[str, Any], index: int, lang: str):
+    """Render a single stored chat message."""
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+
+        # Show source slides for assistant messages
+        if message["role"] == "assistant" and message.get("slides"):
+            render_source_slides(message["slides"], lang, key=f"src_{index}")
+
+
+def _render_history(lang: str):
+    """Render the stored chat history.
+
+    Only runs on full app reruns; turns answered since then are drawn by
+    the input fragment, so each message is on screen exactly once.
+    """
+    for index, message in enumerate(st.session_state.messages):
+        _render_message(message, index, lang)
+
+    st.session_state._history_rendered = len(st.session_state.messages)
+
+
+@st.fragment
+def _handle_input(lang: str):
+    """Render the chat input and answer new questions."""
+    t = get_translations(lang)
+    engine = get_query_engine()
+
+    # Turns answered by earlier runs of this fragment aren't part of the
+    # history's output until the next full rerun
+    messages = st.session_state.messages
+    for index in range(st.session_state.get('_history_rendered', 0), len(messages)):
+        _render_message(messages[index], index, lang)
+
+    # Check for pending query
+    pending_query = st.session_state.pop('pending_query', None)
 
     # Show suggestion chips if no messages yet
     if not st.session_state.messages:
         render_suggestion_chips(lang)
 
     # Chat input
-    prompt = st.chat_input(t('chat_placeholder'))
+    prompt = st.chat_input(t['chat_placeholder'])
 
     # Use pending query if no direct input
     if pending_query and not prompt:
@@ -62,97 +195,129 @@ def render_chat_interface(lang: str = 'en'):
 
     if prompt:
         # Add user message
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        _append_message({"role": "user", "content": prompt})
 
         with st.chat_message("user"):
             st.markdown(prompt)
 
         # Generate response
         with st.chat_message("assistant"):
-            with st.spinner(t('chat_thinking')):
-                try:
-                    result = st.session_state.query_engine.chat(
+            try:
+                # Only retrieval runs under the spinner; the answer is
+                # rendered token by token as Claude produces it
+                with st.spinner(t['chat_thinking']):
+                    result, stream = engine.chat_stream(
                         prompt,
-                        chat_history=st.session_state.messages[:-1]
+                        chat_history=st.session_state.chat_history,
+                        summary=st.session_state.chat_summary
                     )
+                answer = st.write_stream(stream)
 
-                    st.markdown(result["answer"])
+                slides = [SourceSlide.from_result(s) for s in result.get("relevant_slides", [])]
 
-                    # Show source slides
-                    if result.get("relevant_slides"):
-                        render_source_slides(result["relevant_slides"], lang)
+                # Show source slides
+                if slides:
+                    render_source_slides(
+                        slides, lang, key=f"src_{len(st.session_state.messages)}"
+                    )
 
-                    # Store assistant message
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": result["answer"],
-                        "slides": result.get("relevant_slides", [])
-                    })
+                # Store assistant message
+                _append_message({
+                    "role": "assistant",
+                    "content": answer,
+                    "slides": slides
+                })
 
-                except Exception as e:
-                    error_msg = t('chat_error').format(error=str(e))
-                    st.error(error_msg)
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": error_msg
-                    })
+            except Exception as e:
+                answer = t['chat_error'].format(error=str(e))
+                st.error(answer)
+                _append_message({
+                    "role": "assistant",
+                    "content": answer
+                })
+
+        _record_turn(prompt, answer)
+
+
+def _preview(content: str) -> str:
+    """Truncate slide content for the sources list."""
+    return content[:200] + "..." if len(content) > 200 else content
 
 
 def render_suggestion_chips(lang: str = 'en'):
     """Render suggestion chips above the chat input."""
-    t = lambda key: get_text(key, lang)
+    t = get_translations(lang)
 
     suggestions = [
-        t('action_summarize_query'),
-        t('action_key_points_query'),
-        t('action_data_charts_query'),
+        s for s in (
+            t['action_summarize_query'],
+            t['action_key_points_query'],
+            t['action_data_charts_query'],
+        ) if s
     ]
+    if not suggestions:
+        return
+
+    # Truncate long suggestions
+    display = tuple(s[:40] + "..." if len(s) > 40 else s for s in suggestions)
 
+    # The callback queues the query before the click's own fragment rerun,
+    # so no extra st.rerun() is needed
     cols = st.columns(len(suggestions))
     for i, suggestion in enumerate(suggestions):
         with cols[i]:
-            # Truncate long suggestions
-            display_text = suggestion[:40] + "..." if len(suggestion) > 40 else suggestion
-            if st.button(display_text, key=f"suggestion_{i}", use_container_width=True):
-                st.session_state.pending_query = suggestion
-                st.rerun()
+            st.button(
+                display[i],
+                key=f"suggestion_{i}",
+                on_click=_queue_query,
+                args=(suggestion,),
+                use_container_width=True
+            )
+
 
+def _queue_query(query: str):
+    """Queue a query for the next run of the chat input fragment."""
+    st.session_state.pending_query = query
+
+
+def render_source_slides(slides: List[SourceSlide], lang: str = 'en', key: str = "sources"):
+    """
+    Render the source slides used to generate a response.
 
-def render_source_slides(slides: List[Dict[str, Any]], lang: str = 'en'):
-    """Render the source slides used to generate a response."""
-    t = lambda key: get_text(key, lang)
+    The slide cards are only built while the sources toggle is on, so
+    collapsed sources in the chat history cost a single widget per rerun.
+
+    Args:
+        slides: Source slides stored with the assistant message
+        lang: Language code for translations
+        key: Widget key, unique per message
+    """
+    t = get_translations(lang)
 
     if not slides:
         return
 
-    with st.expander(f"{t('sources')} ({len(slides)} {t('slides')})", expanded=False):
-        for slide in slides:
-            metadata = slide.get('metadata', {})
-            slide_num = metadata.get('slide_number', '?')
-            title = metadata.get('title', t('untitled'))
-            distance = slide.get('distance', 0)
-
-            # Relevance indicator
-            if distance < 0.5:
-                relevance = t('relevance_high')
-            elif distance < 1.0:
-                relevance = t('relevance_medium')
-            else:
-                relevance = t('relevance_low')
-
-            st.markdown(f"""
-                <div class="slide-card">
-                    <span class="slide-number">{t('slide')} {slide_num}</span>
-                    <div class="slide-title">{title}</div>
-                    <span class="badge">{t('relevance')}: {relevance}</span>
-                </div>
-            """, unsafe_allow_html=True)
-
-            # Show content preview
-            content = slide.get('content', '')
-            if len(content) > 200:
-                content = content[:200] + "..."
-            st.caption(content)
+    if not st.toggle(f"{t['sources']} ({len(slides)} {t['slides']})", key=key):
+        return
+
+    # Relevance indicator for every slide in one vectorized pass
+    labels = (t['relevance_high'], t['relevance_medium'], t['relevance_low'])
+    distances = np.fromiter((s.distance for s in slides), dtype=np.float32, count=len(slides))
+    buckets = np.searchsorted(_RELEVANCE_EDGES, distances, side='right')
+
+    cards = []
+    for slide, bucket in zip(slides, buckets):
+        relevance = labels[bucket]
+        cards.append(f"""<div class="slide-card">
+<span class="slide-number">{t['slide']} {slide.slide_number}</span>
+<div class="slide-title">{html.escape(str(slide.title or t['untitled']))}</div>
+<span class="badge">{t['relevance']}: {relevance}</span>
+<div class="slide-caption">{html.escape(" ".join(slide.content_preview.split()))}</div>
+</div>""")
+
+    # One markdown element for all cards instead of two per slide. The
+    # preview is flattened to one line so a blank line can't end the HTML block.
+    st.markdown("\n".join(cards), unsafe_allow_html=True)
 
 
 def add_user_query(query: str):
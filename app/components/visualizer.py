@@ -7,11 +7,16 @@ Handles data visualization and chart regeneration.
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 from typing import List, Dict, Any, Optional
 import re
 
 
+# "Category: Value", "Category - Value" or "Category Value%" in one pass
+_CHART_PATTERN = re.compile(r'([A-Za-z\s]+)(?::\s*|\s*-\s*|\s+)(\d+(?:\.\d+)?%?)')
+
+
 def render_slide_viewer(slide_data: Dict[str, Any]):
     """
     Render a detailed view of a single slide.
@@ -36,14 +41,20 @@ def render_slide_viewer(slide_data: Dict[str, Any]):
     tables = slide_data.get('tables', [])
     for i, table in enumerate(tables):
         st.markdown(f"**Table {i + 1}:**")
-        render_table(table)
+        render_table(table, key_suffix=f"{slide_data.get('slide_number', '?')}_{i}")
 
     # Indicators
     render_content_indicators(slide_data)
 
 
-def render_table(table_data: Dict[str, Any]):
-    """Render a table with optional interactive features."""
+def render_table(table_data: Dict[str, Any], key_suffix: str):
+    """
+    Render a table with optional interactive features.
+
+    Args:
+        table_data: Table dict with 'rows' and optional 'headers'
+        key_suffix: Stable suffix for widget keys, unique per table on the page
+    """
     rows = table_data.get('rows', [])
     headers = table_data.get('headers', [])
 
@@ -64,25 +75,31 @@ def render_table(table_data: Dict[str, Any]):
 
     # Create DataFrame
     try:
-        df = pd.DataFrame(data_rows, columns=columns[:len(data_rows[0])] if data_rows else columns)
+        df = pd.DataFrame.from_records(
+            data_rows,
+            columns=columns[:len(data_rows[0])] if data_rows else columns
+        )
         st.dataframe(df, use_container_width=True)
 
         # Offer visualization if numeric data exists
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        numeric_cols = df.select_dtypes(include='number').columns.tolist()
         if numeric_cols:
-            if st.checkbox(f"Visualize table data", key=f"viz_{hash(str(rows))}"):
-                render_table_chart(df)
+            if st.checkbox(f"Visualize table data", key=f"viz_{key_suffix}"):
+                categorical_cols = df.select_dtypes(include='object').columns.tolist()
+                render_table_chart(df, numeric_cols, categorical_cols, key_suffix)
 
     except Exception as e:
         # Fallback to markdown table
         st.markdown(format_table_markdown(table_data))
 
 
-def render_table_chart(df: pd.DataFrame):
-    """Generate a chart from table data."""
-    numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
-
+def render_table_chart(
+    df: pd.DataFrame,
+    numeric_cols: List[str],
+    categorical_cols: List[str],
+    key_suffix: str
+):
+    """Generate a chart from table data using pre-classified columns."""
     if not numeric_cols:
         st.info("No numeric data to visualize")
         return
@@ -93,14 +110,14 @@ def render_table_chart(df: pd.DataFrame):
         chart_type = st.selectbox(
             "Chart Type",
             ["Bar", "Line", "Area", "Pie"],
-            key=f"chart_type_{id(df)}"
+            key=f"chart_type_{key_suffix}"
         )
 
     with col2:
         y_col = st.selectbox(
             "Value Column",
             numeric_cols,
-            key=f"y_col_{id(df)}"
+            key=f"y_col_{key_suffix}"
         )
 
     # Determine x-axis
@@ -133,21 +150,17 @@ def render_table_chart(df: pd.DataFrame):
 
 def format_table_markdown(table_data: Dict[str, Any]) -> str:
     """Convert table data to markdown format."""
-    rows = table_data.get('rows', [])
+    rows = table_data.get('rows') or []
     if not rows:
         return "*Empty table*"
 
-    lines = []
-
-    # Header
-    lines.append("| " + " | ".join(str(cell) for cell in rows[0]) + " |")
-    lines.append("| " + " | ".join(["---"] * len(rows[0])) + " |")
+    separator = "| " + " | ".join(["---"] * len(rows[0])) + " |"
 
-    # Data rows
-    for row in rows[1:]:
-        lines.append("| " + " | ".join(str(cell) for cell in row) + " |")
+    def format_row(row) -> str:
+        # Cells extracted from slides are already strings
+        return "| " + " | ".join(cell if type(cell) is str else str(cell) for cell in row) + " |"
 
-    return "\n".join(lines)
+    return "\n".join((format_row(rows[0]), separator, *map(format_row, rows[1:])))
 
 
 def render_content_indicators(slide_data: Dict[str, Any]):
@@ -198,23 +211,29 @@ def render_data_visualization(data: Dict[str, Any], chart_type: str = "auto"):
 
     if chart_type == "bar":
         fig = go.Figure()
-        for s in series:
-            fig.add_trace(go.Bar(
-                x=labels,
-                y=s.get('data', values),
+        x = np.asarray(labels, dtype=object)
+        fig.add_traces([
+            go.Bar(
+                x=x,
+                y=np.asarray(s.get('data', values)),
                 name=s.get('name', '')
-            ))
+            )
+            for s in series
+        ])
         fig.update_layout(title=title, barmode='group')
 
     elif chart_type == "line":
         fig = go.Figure()
-        for s in series:
-            fig.add_trace(go.Scatter(
-                x=labels,
-                y=s.get('data', values),
+        x = np.asarray(labels, dtype=object)
+        fig.add_traces([
+            go.Scatter(
+                x=x,
+                y=np.asarray(s.get('data', values)),
                 name=s.get('name', ''),
                 mode='lines+markers'
-            ))
+            )
+            for s in series
+        ])
         fig.update_layout(title=title)
 
     elif chart_type == "pie":
@@ -251,24 +270,15 @@ def parse_chart_data_from_text(text: str) -> Optional[Dict[str, Any]]:
         'title': ''
     }
 
-    # Look for patterns like "Category: Value" or "Category - Value"
-    patterns = [
-        r'([A-Za-z\s]+):\s*(\d+(?:\.\d+)?)',
-        r'([A-Za-z\s]+)\s*-\s*(\d+(?:\.\d+)?)',
-        r'([A-Za-z\s]+)\s+(\d+(?:\.\d+)?%?)'
-    ]
-
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        if matches:
-            for label, value in matches:
-                data['labels'].append(label.strip())
-                # Remove % if present
-                value = value.replace('%', '')
-                try:
-                    data['values'].append(float(value))
-                except ValueError:
-                    pass
+    # Look for patterns like "Category: Value" or "Category - Value".
+    # Each span of text yields at most one label/value pair.
+    for match in _CHART_PATTERN.finditer(text):
+        try:
+            value = float(match.group(2).rstrip('%'))
+        except ValueError:
+            continue
+        data['labels'].append(match.group(1).strip())
+        data['values'].append(value)
 
     if data['labels'] and data['values']:
         return data
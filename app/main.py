@@ -6,15 +6,28 @@ using natural language. Features bilingual Arabic/English support.
 """
 
 import streamlit as st
+import streamlit.components.v1 as components
+import hashlib
+import html
+import importlib.util
+import json
 import os
+import re
+import string
 import sys
+from itertools import islice
+from typing import Any, Dict, Iterator, Tuple
 
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# When the package is installed (pip install -e .) `app` resolves normally;
+# only a bare `streamlit run app/main.py` checkout needs the repo root on sys.path
+if importlib.util.find_spec("app") is None:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.components.chat import render_chat_interface
-from app.utils.helpers import load_environment
-from app.utils.translations import get_text
+# The chat/upload components and the services behind them (anthropic,
+# chromadb, python-pptx) are imported on first use so the welcome page can
+# paint before those libraries load
+from app.utils.helpers import load_environment, gc_paused
+from app.utils.translations import get_translations, get_texts
 
 # Load environment variables
 load_environment()
@@ -28,742 +41,625 @@ st.set_page_config(
 )
 
 
-def get_app_css(is_dark: bool, is_rtl: bool) -> str:
-    """Generate application CSS with top navbar."""
-
-    direction = "rtl" if is_rtl else "ltr"
-    text_align = "right" if is_rtl else "left"
-    flex_dir = "row-reverse" if is_rtl else "row"
-
-    if is_dark:
-        colors = {
-            'bg_main': '#1a1a1a',
-            'bg_navbar': '#242424',
-            'bg_card': '#2d2d2d',
-            'bg_hover': '#363636',
-            'text_primary': '#ffffff',
-            'text_secondary': '#a0a0a0',
-            'text_muted': '#707070',
-            'border': '#404040',
-            'accent': '#d4a853',
-            'accent_hover': '#e5b964',
-            'accent_soft': 'rgba(212, 168, 83, 0.15)',
-        }
-    else:
-        colors = {
-            'bg_main': '#ffffff',
-            'bg_navbar': '#f7f7f8',
-            'bg_card': '#ffffff',
-            'bg_hover': '#f0f0f0',
-            'text_primary': '#1a1a1a',
-            'text_secondary': '#666666',
-            'text_muted': '#999999',
-            'border': '#e0e0e0',
-            'accent': '#c9940a',
-            'accent_hover': '#b8860b',
-            'accent_soft': 'rgba(201, 148, 10, 0.1)',
-        }
+# Comments and quoted strings, matched together so that a quote inside a
+# comment (or "/*" inside a string) doesn't start the other
+_CSS_COMMENT_OR_STRING = re.compile(
+    r'/\*.*?\*/|("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')', re.S
+)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCT_SPACE = re.compile(r'\s*([{};,>])\s*')
+# Only the space after a colon: a space before one is a descendant
+# combinator in selectors (".a :hover")
+_CSS_COLON_SPACE = re.compile(r':\s+')
+_CSS_LAST_SEMICOLON = re.compile(r';}')
 
-    return f"""
-    <style>
-        /* ============================================
-           FONTS
-           ============================================ */
-        @import url('https://fonts.googleapis.com/css2?family=IBM+Plex+Sans:wght@400;500;600&family=IBM+Plex+Sans+Arabic:wght@400;500;600&display=swap');
-
-        /* ============================================
-           CSS VARIABLES
-           ============================================ */
-        :root {{
-            --bg-main: {colors['bg_main']};
-            --bg-navbar: {colors['bg_navbar']};
-            --bg-card: {colors['bg_card']};
-            --bg-hover: {colors['bg_hover']};
-            --text-primary: {colors['text_primary']};
-            --text-secondary: {colors['text_secondary']};
-            --text-muted: {colors['text_muted']};
-            --border: {colors['border']};
-            --accent: {colors['accent']};
-            --accent-hover: {colors['accent_hover']};
-            --accent-soft: {colors['accent_soft']};
-            --font-main: {"'IBM Plex Sans Arabic', " if is_rtl else ""}'IBM Plex Sans', -apple-system, sans-serif;
-        }}
 
-        /* ============================================
-           GLOBAL STYLES
-           ============================================ */
-        .stApp {{
-            background: var(--bg-main) !important;
-        }}
+def _minify_css_code(css: str) -> str:
+    """Collapse whitespace in CSS that contains no comments or strings."""
+    css = _CSS_SPACE.sub(' ', css)
+    css = _CSS_PUNCT_SPACE.sub(r'\1', css)
+    css = _CSS_COLON_SPACE.sub(':', css)
+    return _CSS_LAST_SEMICOLON.sub('}', css)
 
-        /* Hide Streamlit elements */
-        #MainMenu, footer, header[data-testid="stHeader"],
-        section[data-testid="stSidebar"],
-        [data-testid="stSidebarCollapsedControl"],
-        [data-testid="collapsedControl"] {{
-            display: none !important;
-        }}
 
-        html, body, [class*="css"] {{
-            font-family: var(--font-main) !important;
-            direction: {direction};
-        }}
+def minify_css(css: str) -> str:
+    """
+    Strip comments and collapse whitespace in a stylesheet.
 
-        h1, h2, h3, h4, h5, h6 {{
-            color: var(--text-primary) !important;
-            font-family: var(--font-main) !important;
-        }}
+    Quoted strings (content values, attribute selectors, font names) are
+    passed through unchanged.
+    """
+    parts = []
+    code = []
+    pos = 0
+    for match in _CSS_COMMENT_OR_STRING.finditer(css):
+        code.append(css[pos:match.start()])
+        pos = match.end()
+        if match.group(1):
+            parts.append(_minify_css_code("".join(code)))
+            parts.append(match.group(1))
+            code = []
+    code.append(css[pos:])
+    parts.append(_minify_css_code("".join(code)))
+    return "".join(parts).strip()
+
+
+# Every rule is scoped under this body class, which outranks Streamlit's own
+# class selectors without resorting to !important
+CSS_SCOPE_CLASS = "dd-app"
+CSS_SCOPE = f"body.{CSS_SCOPE_CLASS}"
+
+# Selector list of a rule: starts the stylesheet or follows a brace (at-rule
+# preludes such as "@media ..." are skipped by excluding "@")
+_CSS_SELECTORS = re.compile(r'(^|[{}])([^{}@]+)\{')
+
+
+def _scope_selector(selector: str) -> str:
+    """Prefix one selector with CSS_SCOPE."""
+    if selector == "body":
+        return CSS_SCOPE
+    if selector.startswith("[dir="):
+        # Direction variants key off <html dir>: [dir="rtl"] .x -> html[dir="rtl"] body.dd-app .x
+        direction, _, rest = selector.partition(" ")
+        return f"html{direction} {_scope_selector(rest)}"
+    if selector.startswith(("html", ":root", "::")):
+        # Outside <body> (or the viewport scrollbar): leave as is
+        return selector
+    return f"{CSS_SCOPE} {selector}"
+
+
+def scope_css(css: str) -> str:
+    """
+    Prefix every selector of a minified stylesheet with CSS_SCOPE.
 
-        p, span, div, label {{
-            font-family: var(--font-main) !important;
-        }}
+    Args:
+        css: Output of minify_css
 
-        /* ============================================
-           TOP NAVBAR
-           ============================================ */
-        .navbar {{
-            position: fixed;
-            top: 0;
-            left: 0;
-            right: 0;
-            height: 60px;
-            background: var(--bg-navbar);
-            border-bottom: 1px solid var(--border);
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            padding: 0 1.5rem;
-            z-index: 1000;
-            flex-direction: {flex_dir};
-        }}
+    Returns:
+        The stylesheet with every selector prefixed
+    """
+    return _CSS_SELECTORS.sub(
+        lambda m: m.group(1) + ",".join(_scope_selector(sel.strip()) for sel in m.group(2).split(",")) + "{",
+        css
+    )
 
-        .navbar-brand {{
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-            flex-direction: {flex_dir};
-        }}
 
-        .navbar-logo {{
-            width: 36px;
-            height: 36px;
-            background: linear-gradient(135deg, var(--accent), var(--accent-hover));
-            border-radius: 8px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.25rem;
-        }}
+# Served by Streamlit at app/static/ (server.enableStaticServing)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL = "app/static"
 
-        .navbar-title {{
-            font-size: 1.125rem;
-            font-weight: 600;
-            color: var(--text-primary);
-            margin: 0;
-        }}
+# Static stylesheet, read, minified and scoped once per process
+with open(os.path.join(STATIC_DIR, "app.css"), encoding="utf-8") as _css_file:
+    _STATIC_CSS = scope_css(minify_css(_css_file.read()))
 
-        .navbar-actions {{
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-            flex-direction: {flex_dir};
-        }}
 
-        .nav-btn {{
-            background: var(--bg-card);
-            border: 1px solid var(--border);
-            border-radius: 8px;
-            padding: 0.5rem 0.75rem;
-            font-size: 0.875rem;
-            color: var(--text-secondary);
-            cursor: pointer;
-            transition: all 0.15s ease;
-            font-family: var(--font-main);
-            display: flex;
-            align-items: center;
-            gap: 0.375rem;
-        }}
+# Self-hosted webfonts: (family, file prefix) x (weight, file suffix),
+# e.g. static/fonts/IBMPlexSans-Medium.woff2
+FONT_FAMILIES = (
+    ("IBM Plex Sans", "IBMPlexSans"),
+    ("IBM Plex Sans Arabic", "IBMPlexSansArabic"),
+)
+FONT_WEIGHTS = ((400, "Regular"), (500, "Medium"), (600, "SemiBold"))
 
-        .nav-btn:hover {{
-            background: var(--bg-hover);
-            border-color: var(--accent);
-            color: var(--text-primary);
-        }}
+# Google Fonts fallback when the .woff2 files aren't shipped. The Latin font
+# is used on every page; the Arabic family is only fetched once the
+# interface is switched to Arabic
+FONTS_URL = "https://fonts.googleapis.com/css2?family=IBM+Plex+Sans:wght@400;500;600&display=swap"
+ARABIC_FONTS_URL = "https://fonts.googleapis.com/css2?family=IBM+Plex+Sans+Arabic:wght@400;500;600&display=swap"
 
-        .nav-btn.active {{
-            background: var(--accent-soft);
-            border-color: var(--accent);
-            color: var(--accent);
-        }}
 
-        /* File indicator in navbar */
-        .nav-file {{
-            background: var(--accent-soft);
-            border: 1px solid var(--accent);
-            border-radius: 2rem;
-            padding: 0.375rem 0.875rem;
-            font-size: 0.8rem;
-            color: var(--accent);
-            font-weight: 500;
-            max-width: 200px;
-            overflow: hidden;
-            text-overflow: ellipsis;
-            white-space: nowrap;
-        }}
+def font_face_css() -> str:
+    """
+    Build @font-face rules for the webfonts present in static/fonts.
 
-        /* ============================================
-           MAIN CONTAINER
-           ============================================ */
-        .main .block-container {{
-            max-width: 900px !important;
-            padding: 80px 1rem 120px 1rem !important;
-            margin: 0 auto !important;
-        }}
+    Browsers only download a face once text actually uses it, so the
+    Arabic files stay untouched until the interface is in Arabic.
 
-        /* ============================================
-           WELCOME HEADER
-           ============================================ */
-        .app-header {{
-            text-align: center;
-            padding: 2rem 0 1.5rem;
-        }}
+    Returns:
+        Minified CSS, or "" when no font files are shipped or static
+        serving is off (their URLs would 404)
+    """
+    if not st.get_option("server.enableStaticServing"):
+        return ""
 
-        .app-logo {{
-            width: 72px;
-            height: 72px;
-            background: linear-gradient(135deg, var(--accent), var(--accent-hover));
-            border-radius: 16px;
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 2.5rem;
-            margin-bottom: 1rem;
-            box-shadow: 0 4px 20px var(--accent-soft);
-        }}
+    rules = []
+    for family, prefix in FONT_FAMILIES:
+        for weight, suffix in FONT_WEIGHTS:
+            filename = f"{prefix}-{suffix}.woff2"
+            if os.path.isfile(os.path.join(STATIC_DIR, "fonts", filename)):
+                rules.append(
+                    f"@font-face{{font-family:'{family}';"
+                    f"src:url('{STATIC_URL}/fonts/{filename}') format('woff2');"
+                    f"font-weight:{weight};font-style:normal;font-display:swap}}"
+                )
+    return "".join(rules)
 
-        .app-title {{
-            font-size: 2rem !important;
-            font-weight: 600 !important;
-            color: var(--text-primary) !important;
-            margin: 0 0 0.5rem 0 !important;
-        }}
 
-        .app-subtitle {{
-            font-size: 1.125rem;
-            color: var(--text-muted);
-            margin: 0;
-        }}
+_FONT_CSS = font_face_css()
 
-        /* ============================================
-           UPLOAD ZONE
-           ============================================ */
-        [data-testid="stFileUploader"] {{
-            margin-top: 1.5rem;
-        }}
 
-        [data-testid="stFileUploader"] > div:first-child {{
-            background: var(--bg-card) !important;
-            border: 2px dashed var(--border) !important;
-            border-radius: 16px !important;
-            padding: 2.5rem !important;
-            transition: all 0.2s ease !important;
-        }}
+def body_class(class_name: str) -> str:
+    """JS snippet that adds a class to the page <body>."""
+    return f"doc.body.classList.add({json.dumps(class_name)});"
 
-        [data-testid="stFileUploader"] > div:first-child:hover {{
-            border-color: var(--accent) !important;
-            background: var(--accent-soft) !important;
-        }}
 
-        [data-testid="stFileUploader"] label {{
-            color: var(--text-secondary) !important;
-            font-size: 1rem !important;
-        }}
+def html_dir(direction: str) -> str:
+    """JS snippet that sets the page's <html dir> ("ltr" or "rtl")."""
+    return f"doc.documentElement.dir = {json.dumps(direction)};"
 
-        [data-testid="stFileUploader"] small {{
-            color: var(--text-muted) !important;
-        }}
 
-        /* ============================================
-           STEP CARDS
-           ============================================ */
-        .step-card {{
-            background: var(--bg-card);
-            border: 1px solid var(--border);
-            border-radius: 12px;
-            padding: 1.5rem;
-            text-align: center;
-            transition: all 0.2s ease;
+def head_style(style_id: str, css: str) -> str:
+    """JS snippet that installs (or replaces) a <style> element in <head>."""
+    return f"""
+        let style = doc.getElementById({json.dumps(style_id)});
+        if (!style) {{
+            style = doc.createElement("style");
+            style.id = {json.dumps(style_id)};
+            doc.head.appendChild(style);
         }}
+        style.textContent = {json.dumps(css)};
+    """
 
-        .step-card:hover {{
-            border-color: var(--accent);
-            transform: translateY(-2px);
-            box-shadow: 0 4px 12px rgba(0,0,0,0.1);
-        }}
 
-        .step-number {{
-            width: 36px;
-            height: 36px;
-            background: var(--accent);
-            color: white;
-            border-radius: 50%;
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            font-weight: 600;
-            font-size: 1rem;
-            margin-bottom: 0.75rem;
+def head_stylesheet(link_id: str, href: str) -> str:
+    """JS snippet that preloads a stylesheet and applies it once downloaded."""
+    return f"""
+        if (!doc.getElementById({json.dumps(link_id)})) {{
+            const link = doc.createElement("link");
+            link.id = {json.dumps(link_id)};
+            link.rel = "preload";
+            link.as = "style";
+            link.href = {json.dumps(href)};
+            link.onload = () => {{ link.onload = null; link.rel = "stylesheet"; }};
+            doc.head.appendChild(link);
         }}
+    """
 
-        .step-title {{
-            font-weight: 600;
-            color: var(--text-primary);
-            margin-bottom: 0.5rem;
-            font-size: 1rem;
-        }}
 
-        .step-desc {{
-            font-size: 0.875rem;
-            color: var(--text-muted);
-            line-height: 1.5;
-        }}
+def inject_head(*snippets: str):
+    """
+    Run head_* snippets against the page <head>.
 
-        /* ============================================
-           CHAT MESSAGES
-           ============================================ */
-        [data-testid="stChatMessage"] {{
-            background: var(--bg-card) !important;
-            border: 1px solid var(--border) !important;
-            border-radius: 12px !important;
-            padding: 1rem 1.25rem !important;
-            margin-bottom: 0.75rem !important;
-            direction: {direction};
-            text-align: {text_align};
-        }}
+    Elements emitted with st.markdown are removed on any rerun that doesn't
+    emit them again, so assets that should only be sent once per session are
+    attached to the parent document instead.
 
-        [data-testid="stChatMessage"] [data-testid="stMarkdownContainer"] {{
-            direction: {direction} !important;
-            text-align: {text_align} !important;
-        }}
+    Args:
+        snippets: Snippets from head_style / head_stylesheet
+    """
+    components.html(
+        "<script>const doc = window.parent.document;" + "".join(snippets) + "</script>",
+        height=0
+    )
 
-        [data-testid="stChatMessage"] [data-testid="stMarkdownContainer"] p {{
-            color: var(--text-primary) !important;
-            line-height: 1.8;
-            direction: {direction} !important;
-            text-align: {text_align} !important;
-        }}
 
-        [data-testid="stChatMessage"] [data-testid="stMarkdownContainer"] ul,
-        [data-testid="stChatMessage"] [data-testid="stMarkdownContainer"] ol {{
-            direction: {direction} !important;
-            text-align: {text_align} !important;
-            padding-{"right" if is_rtl else "left"}: 1.5rem !important;
-            padding-{"left" if is_rtl else "right"}: 0 !important;
-            margin: 0.75rem 0 !important;
-        }}
+# Theme variables; filled in by get_app_css. Direction-dependent rules
+# live in static/app.css under [dir="rtl"] selectors.
+# Minified once here, so each variant only pays for the substitution.
+_THEME_CSS_TEMPLATE = string.Template(minify_css("""
+    :root {
+        --bg-main: $bg_main;
+        --bg-navbar: $bg_navbar;
+        --bg-card: $bg_card;
+        --bg-hover: $bg_hover;
+        --text-primary: $text_primary;
+        --text-secondary: $text_secondary;
+        --text-muted: $text_muted;
+        --border: $border;
+        --accent: $accent;
+        --accent-hover: $accent_hover;
+        --accent-soft: $accent_soft;
+    }
+"""))
+
+
+_DARK_COLORS = {
+    'bg_main': '#1a1a1a',
+    'bg_navbar': '#242424',
+    'bg_card': '#2d2d2d',
+    'bg_hover': '#363636',
+    'text_primary': '#ffffff',
+    'text_secondary': '#a0a0a0',
+    'text_muted': '#707070',
+    'border': '#404040',
+    'accent': '#d4a853',
+    'accent_hover': '#e5b964',
+    'accent_soft': 'rgba(212, 168, 83, 0.15)',
+}
+
+_LIGHT_COLORS = {
+    'bg_main': '#ffffff',
+    'bg_navbar': '#f7f7f8',
+    'bg_card': '#ffffff',
+    'bg_hover': '#f0f0f0',
+    'text_primary': '#1a1a1a',
+    'text_secondary': '#666666',
+    'text_muted': '#999999',
+    'border': '#e0e0e0',
+    'accent': '#c9940a',
+    'accent_hover': '#b8860b',
+    'accent_soft': 'rgba(201, 148, 10, 0.1)',
+}
+
+
+def get_app_css(is_dark: bool) -> str:
+    """Generate the theme CSS.
+
+    Only the color variables live here; everything else is in
+    static/app.css. Use _CSS_CACHE rather than calling this per run.
+    """
+    return _THEME_CSS_TEMPLATE.substitute(_DARK_COLORS if is_dark else _LIGHT_COLORS)
 
-        [data-testid="stChatMessage"] [data-testid="stMarkdownContainer"] li {{
-            color: var(--text-primary) !important;
-            line-height: 1.8;
-            margin-bottom: 0.5rem;
-            direction: {direction} !important;
-            text-align: {text_align} !important;
-        }}
 
-        [data-testid="stChatMessage"] [data-testid="stMarkdownContainer"] li::marker {{
-            color: var(--accent) !important;
-        }}
+# Both theme variants, built once per process
+_CSS_CACHE = {is_dark: get_app_css(is_dark) for is_dark in (True, False)}
 
-        /* ============================================
-           CHAT INPUT
-           ============================================ */
-        [data-testid="stChatInput"] {{
-            position: fixed !important;
-            bottom: 0 !important;
-            left: 50% !important;
-            transform: translateX(-50%) !important;
-            width: 100% !important;
-            max-width: 900px !important;
-            padding: 1.5rem 1rem !important;
-            background: var(--bg-main) !important;
-            z-index: 100 !important;
-            border-top: 1px solid var(--border) !important;
-        }}
 
-        [data-testid="stChatInput"] > div {{
-            background: var(--bg-card) !important;
-            border: 1px solid var(--border) !important;
-            border-radius: 12px !important;
-            box-shadow: 0 2px 12px rgba(0,0,0,0.1) !important;
-            min-height: 52px !important;
-            display: flex !important;
-            align-items: center !important;
-            padding: 0.25rem !important;
-            gap: 0.5rem !important;
-        }}
+@st.cache_resource(show_spinner=False)
+def get_pptx_processor():
+    """Get the shared PowerPoint processor, importing python-pptx on first use."""
+    from app.services.pptx_processor import PPTXProcessor
+    return PPTXProcessor()
 
-        [data-testid="stChatInput"] > div:focus-within {{
-            border-color: var(--accent) !important;
-        }}
 
-        [data-testid="stChatInput"] textarea {{
-            font-family: var(--font-main) !important;
-            color: var(--text-primary) !important;
-            direction: {direction} !important;
-            text-align: {text_align} !important;
-            min-height: 24px !important;
-            padding: 0.75rem 1rem !important;
-            flex: 1 !important;
-            padding-{"left" if is_rtl else "right"}: 50px !important;
-        }}
+@st.cache_resource(show_spinner=False)
+def get_pdf_processor():
+    """Get the shared PDF processor, importing pdfplumber on first use."""
+    from app.services.pdf_processor import PDFProcessor
+    return PDFProcessor()
 
-        [data-testid="stChatInput"] textarea::placeholder {{
-            color: var(--text-muted) !important;
-        }}
 
-        [data-testid="stChatInput"] button {{
-            background: var(--accent) !important;
-            border: none !important;
-            border-radius: 8px !important;
-            min-width: 40px !important;
-            width: 40px !important;
-            height: 40px !important;
-            min-height: 40px !important;
-            flex-shrink: 0 !important;
-            position: absolute !important;
-            {"left" if is_rtl else "right"}: 0.75rem !important;
-            margin: 0 !important;
-        }}
+_NAVBAR_TEMPLATE = """
+    <div class="navbar">
+        <div class="navbar-brand">
+            <div class="navbar-logo">📊</div>
+            <span class="navbar-title">{title}</span>
+        </div>
+        <div class="navbar-actions">{file_indicator}</div>
+    </div>
+"""
 
-        [data-testid="stChatInput"] button svg {{
-            fill: white !important;
-        }}
 
-        /* ============================================
-           BUTTONS
-           ============================================ */
-        .stButton > button {{
-            background: var(--bg-card) !important;
-            color: var(--text-primary) !important;
-            border: 1px solid var(--border) !important;
-            border-radius: 8px !important;
-            font-family: var(--font-main) !important;
-            font-size: 0.875rem !important;
-            padding: 0.5rem 1rem !important;
-            transition: all 0.15s ease !important;
-            min-height: 38px !important;
-        }}
+def _toggle_theme():
+    """Flip between dark and light mode."""
+    st.session_state.dark_mode = not st.session_state.dark_mode
 
-        .stButton > button:hover {{
-            background: var(--bg-hover) !important;
-            border-color: var(--accent) !important;
-        }}
 
-        /* ============================================
-           EXPANDER & ALERTS
-           ============================================ */
-        [data-testid="stExpander"] {{
-            background: var(--bg-card) !important;
-            border: 1px solid var(--border) !important;
-            border-radius: 8px !important;
-        }}
+def _toggle_language():
+    """Switch between English and Arabic."""
+    st.session_state.language = "ar" if st.session_state.language == "en" else "en"
 
-        [data-testid="stExpander"] summary {{
-            color: var(--text-secondary) !important;
-            font-size: 0.875rem !important;
-        }}
 
-        [data-testid="stAlert"] {{
-            background: var(--bg-card) !important;
-            border: 1px solid var(--border) !important;
-            border-radius: 8px !important;
-        }}
+@st.fragment
+def render_theme(is_rtl: bool):
+    """
+    Render the theme CSS and the theme toggle.
 
-        /* ============================================
-           SPINNER & DIVIDER
-           ============================================ */
-        [data-testid="stSpinner"] > div {{
-            border-top-color: var(--accent) !important;
-        }}
+    Runs as a fragment: switching theme only changes the CSS variables,
+    so clicking the toggle reruns this fragment instead of the whole app.
+    The variables (and the page's dir attribute, which selects the
+    direction rules in static/app.css) are only sent to the browser when
+    theme or direction actually change.
 
-        hr {{
-            border: none !important;
-            height: 1px !important;
-            background: var(--border) !important;
-            margin: 1.5rem 0 !important;
-        }}
+    Args:
+        is_rtl: Whether the current language is right-to-left
+    """
+    is_dark = st.session_state.dark_mode
 
-        /* ============================================
-           SLIDE CARDS
-           ============================================ */
-        .slide-card {{
-            background: var(--bg-card);
-            border: 1px solid var(--border);
-            border-radius: 8px;
-            padding: 0.75rem 1rem;
-            margin-bottom: 0.5rem;
-        }}
+    css_key = (is_dark, is_rtl)
+    if st.session_state.get('_css_key') != css_key:
+        snippets = [
+            head_style("dd-theme-css", _CSS_CACHE[is_dark]),
+            html_dir("rtl" if is_rtl else "ltr")
+        ]
+        if is_rtl and not _FONT_CSS:
+            # No-op when the Arabic font link is already in <head>
+            snippets.append(head_stylesheet("dd-fonts-ar", ARABIC_FONTS_URL))
+        inject_head(*snippets)
+        st.session_state._css_key = css_key
+
+    theme_label = "☀️ Light" if is_dark else "🌙 Dark"
+    st.button(theme_label, key="theme_btn", on_click=_toggle_theme, use_container_width=True)
+
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=8,
+    hash_funcs={"builtins.bytes": lambda b: hashlib.blake2b(b, digest_size=16).digest()}
+)
+def process_file_bytes(file_bytes: bytes, filename: str, file_ext: str):
+    """
+    Parse an uploaded PowerPoint or PDF, memoized on the file content.
 
-        .slide-number {{
-            background: var(--accent);
-            color: white;
-            padding: 0.125rem 0.5rem;
-            border-radius: 4px;
-            font-size: 0.75rem;
-            font-weight: 600;
-        }}
+    The cache is in memory only, so max_entries bounds it and parsed
+    results never outlive the dataclass layout that produced them.
 
-        .slide-title {{
-            color: var(--text-primary);
-            font-weight: 500;
-            margin-top: 0.375rem;
-            font-size: 0.875rem;
-        }}
+    Args:
+        file_bytes: Raw file content
+        filename: Original file name
+        file_ext: 'pptx' or 'pdf'
 
-        .badge {{
-            background: var(--accent-soft);
-            color: var(--accent);
-            padding: 0.125rem 0.5rem;
-            border-radius: 4px;
-            font-size: 0.75rem;
-            margin-top: 0.375rem;
-            display: inline-block;
-        }}
+    Returns:
+        ProcessedPresentation or ProcessedPDF
+    """
+    processor = get_pdf_processor() if file_ext == 'pdf' else get_pptx_processor()
+    return processor.process_bytes(file_bytes, filename)
 
-        /* ============================================
-           SCROLLBAR
-           ============================================ */
-        ::-webkit-scrollbar {{
-            width: 8px;
-        }}
 
-        ::-webkit-scrollbar-track {{
-            background: transparent;
-        }}
+@st.cache_data(show_spinner=False, max_entries=32)
+def navbar_html(lang: str, filename: str = "") -> str:
+    """
+    Build the navbar markup; it only changes with the language or loaded file.
 
-        ::-webkit-scrollbar-thumb {{
-            background: var(--border);
-            border-radius: 4px;
-        }}
+    Args:
+        lang: Language code for translations
+        filename: Loaded file name, or "" to leave out the file indicator
+    """
+    t = get_translations(lang)
 
-        ::-webkit-scrollbar-thumb:hover {{
-            background: var(--text-muted);
-        }}
+    file_indicator = ""
+    if filename:
+        short_name = filename[:20] + ("..." if len(filename) > 20 else "")
+        file_indicator = f'<span class="nav-file">📄 {html.escape(short_name)}</span>'
 
-        /* ============================================
-           RESPONSIVE
-           ============================================ */
-        @media (max-width: 768px) {{
-            .navbar {{
-                padding: 0 1rem;
-            }}
-
-            .navbar-title {{
-                display: none;
-            }}
-
-            .nav-file {{
-                max-width: 120px;
-            }}
-
-            .main .block-container {{
-                padding: 70px 0.75rem 120px 0.75rem !important;
-            }}
-        }}
-    </style>
-    """
+    return _NAVBAR_TEMPLATE.format(title=t['app_title'], file_indicator=file_indicator)
 
 
-def render_navbar(lang: str, is_dark: bool, has_file: bool = False, filename: str = ""):
+def render_navbar(lang: str, has_file: bool = False, filename: str = ""):
     """Render the top navigation bar."""
-    t = lambda key: get_text(key, lang)
-
-    # Navbar HTML with buttons that will be handled by Streamlit
-    file_indicator = f'<span class="nav-file">📄 {filename[:20]}{"..." if len(filename) > 20 else ""}</span>' if has_file else ""
-
-    st.markdown(f"""
-        <div class="navbar">
-            <div class="navbar-brand">
-                <div class="navbar-logo">📊</div>
-                <span class="navbar-title">{t('app_title')}</span>
-            </div>
-            <div class="navbar-actions">
-                {file_indicator}
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
+    st.html(navbar_html(lang, filename if has_file else ""))
 
     # Settings row below navbar (using Streamlit buttons)
     col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
 
     with col2:
-        theme_label = "☀️ Light" if is_dark else "🌙 Dark"
-        if st.button(theme_label, key="theme_btn", use_container_width=True):
-            st.session_state.dark_mode = not is_dark
-            st.rerun()
+        render_theme(lang == 'ar')
 
     with col3:
+        # Language changes every string on the page, so this one reruns the app
         lang_label = "العربية" if lang == "en" else "English"
-        if st.button(f"🌐 {lang_label}", key="lang_btn", use_container_width=True):
-            st.session_state.language = "ar" if lang == "en" else "en"
-            st.rerun()
+        st.button(f"🌐 {lang_label}", key="lang_btn", on_click=_toggle_language, use_container_width=True)
+
+
+# Session defaults; callables are factories so mutable values aren't
+# shared between sessions
+_SESSION_DEFAULTS = (
+    ('language', 'en'),
+    ('dark_mode', True),
+    ('messages', list),
+)
 
 
 def initialize_session_state():
     """Initialize session state variables."""
-    if 'language' not in st.session_state:
-        st.session_state.language = 'en'
-    if 'dark_mode' not in st.session_state:
-        st.session_state.dark_mode = True
-    if 'messages' not in st.session_state:
-        st.session_state.messages = []
+    for key, default in _SESSION_DEFAULTS:
+        if key not in st.session_state:
+            st.session_state[key] = default() if callable(default) else default
+
+
+# Slides per add_slides_batch call while processing an upload
+EMBED_BATCH_SIZE = 32
+
+
+def iter_slide_rows(result, lang: str) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """Yield (id, embedding content, metadata) for each slide of a presentation."""
+    from app.services.embeddings import create_slide_embedding_content
+
+    t = get_translations(lang)
+    for s in result.slides:
+        yield (
+            f"{result.filename}_slide_{s.slide_number}",
+            create_slide_embedding_content(s.to_dict(include_full_text=False)),
+            {
+                'filename': result.filename,
+                'slide_number': s.slide_number,
+                'title': s.title or f"{t['slide']} {s.slide_number}",
+                'has_chart': s.has_chart,
+                'has_image': s.has_image,
+                'has_table': bool(s.tables)
+            }
+        )
+
+
+def iter_page_rows(result) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """Yield (id, embedding content, metadata) for each page of a PDF."""
+    # Already imported by get_pdf_processor(), so this is a sys.modules hit
+    from app.services.pdf_processor import create_page_embedding_content
+
+    for p in result.pages:
+        yield (
+            f"{result.filename}_page_{p.page_number}",
+            create_page_embedding_content(p.to_dict()),
+            {
+                'filename': result.filename,
+                'slide_number': p.page_number,  # Use slide_number for consistency
+                'title': p.title or f"Page {p.page_number}",
+                'has_chart': False,
+                'has_image': False,
+                'has_table': bool(p.tables)
+            }
+        )
+
+
+def embed_with_progress(embeddings, rows, total: int, status, lang: str):
+    """
+    Stream rows into the vector store in fixed-size chunks, updating a st.status label.
+
+    Only one chunk of rows is held in memory at a time. Building a chunk
+    allocates many small objects, so automatic GC is paused while it is
+    built, but not while it is embedded.
+
+    Args:
+        embeddings: EmbeddingsService to write to
+        rows: Iterable of (id, content, metadata) tuples
+        total: Number of rows, for the progress label
+        status: st.status container to report progress on
+        lang: Language code for translations
+    """
+    t = get_translations(lang)
+    rows = iter(rows)
+    done = 0
+
+    while True:
+        with gc_paused():
+            chunk = list(islice(rows, EMBED_BATCH_SIZE))
+        if not chunk:
+            break
+        ids, contents, metadatas = zip(*chunk)
+        embeddings.add_slides_batch(list(ids), list(contents), list(metadatas))
+        done += len(chunk)
+        status.update(label=t['processing_progress'].format(done=done, total=total))
+
+
+def process_upload(uploaded_file, lang: str) -> bool:
+    """
+    Parse and embed an uploaded file into the session.
+
+    Args:
+        uploaded_file: Streamlit UploadedFile (PPTX or PDF)
+        lang: Language code for translations
+
+    Returns:
+        True if the file was loaded
+    """
+    from app.components.chat import reset_chat
+    from app.components.upload import ProcessedFile, get_embeddings_service
+
+    t = get_translations(lang)
+
+    file_bytes = uploaded_file.getvalue()
+
+    with st.status(t['processing']) as status:
+        try:
+            file_ext = uploaded_file.name.lower().split('.')[-1]
+
+            embeddings = get_embeddings_service()
+            embeddings.clear_collection()
+
+            if file_ext == 'pptx':
+                # Process PowerPoint
+                result = process_file_bytes(file_bytes, uploaded_file.name, file_ext)
+                total_items = result.total_slides
+                embed_with_progress(embeddings, iter_slide_rows(result, lang), total_items, status, lang)
+
+            elif file_ext == 'pdf':
+                # Process PDF
+                result = process_file_bytes(file_bytes, uploaded_file.name, file_ext)
+                total_items = result.total_pages
+                embed_with_progress(embeddings, iter_page_rows(result), total_items, status, lang)
+
+            st.session_state.processed_file = ProcessedFile(
+                name=uploaded_file.name,
+                data=result,
+                file_type=file_ext
+            )
+            st.session_state.embeddings_ready = True
+            reset_chat()
+
+            st.toast(t['upload_success'].format(slides=total_items, filename=uploaded_file.name))
+            return True
+
+        except Exception as e:
+            status.update(state="error", expanded=True)
+            st.error(t['upload_error'].format(error=str(e)))
+            return False
+
+
+STEP_KEYS = (
+    'step_upload', 'step_upload_desc',
+    'step_process', 'step_process_desc',
+    'step_ask', 'step_ask_desc',
+)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def steps_html(lang: str) -> str:
+    """Build the divider and the three step cards as one .steps-grid block (per language)."""
+    t = get_texts(STEP_KEYS, lang)
+
+    steps = (
+        ('1', t['step_upload'], t['step_upload_desc']),
+        ('2', t['step_process'], t['step_process_desc']),
+        ('3', t['step_ask'], t['step_ask_desc']),
+    )
+    cards = "".join(
+        f'''<div class="step-card">
+<div class="step-number">{number}</div>
+<div class="step-title">{title}</div>
+<div class="step-desc">{desc}</div>
+</div>'''
+        for number, title, desc in steps
+    )
+    return f'<hr><div class="steps-grid">{cards}</div>'
+
+
+# Strings used by the welcome view itself (the step cards have their own)
+WELCOME_KEYS = ('app_title', 'app_subtitle', 'upload_label', 'upload_help')
+
+_WELCOME_HEADER_TEMPLATE = """
+    <div class="app-header">
+        <div class="app-logo">📊</div>
+        <h1 class="app-title">{app_title}</h1>
+        <p class="app-subtitle">{app_subtitle}</p>
+    </div>
+"""
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def welcome_header_html(lang: str) -> str:
+    """Build the welcome header markup (per language)."""
+    return _WELCOME_HEADER_TEMPLATE.format_map(get_texts(WELCOME_KEYS, lang))
 
 
 def render_welcome_state(lang: str):
     """Render the welcome state with prominent upload."""
-    t = lambda key: get_text(key, lang)
-
-    # Header
-    st.markdown(f"""
-        <div class="app-header">
-            <div class="app-logo">📊</div>
-            <h1 class="app-title">{t('app_title')}</h1>
-            <p class="app-subtitle">{t('app_subtitle')}</p>
-        </div>
-    """, unsafe_allow_html=True)
-
-    # File uploader - supports PPTX and PDF
-    uploaded_file = st.file_uploader(
-        t('upload_label'),
-        type=["pptx", "pdf"],
-        help=t('upload_help'),
-        key="main_uploader"
-    )
+    t = get_texts(WELCOME_KEYS, lang)
 
-    if uploaded_file is not None:
-        from app.services.embeddings import EmbeddingsService
-
-        if 'processed_file' not in st.session_state or st.session_state.processed_file.get('name') != uploaded_file.name:
-            with st.spinner(t('processing')):
-                try:
-                    file_ext = uploaded_file.name.lower().split('.')[-1]
-
-                    embeddings = EmbeddingsService()
-                    embeddings.clear_collection()
-
-                    if file_ext == 'pptx':
-                        # Process PowerPoint
-                        from app.services.pptx_processor import PPTXProcessor
-                        from app.services.embeddings import create_slide_embedding_content
-
-                        processor = PPTXProcessor()
-                        result = processor.process_uploaded_file(uploaded_file)
-
-                        slides_to_embed = []
-                        for slide in result.slides:
-                            slide_id = f"{result.filename}_slide_{slide.slide_number}"
-                            content = create_slide_embedding_content(slide.to_dict())
-                            slides_to_embed.append({
-                                'id': slide_id,
-                                'content': content,
-                                'metadata': {
-                                    'filename': result.filename,
-                                    'slide_number': slide.slide_number,
-                                    'title': slide.title or f"{t('slide')} {slide.slide_number}",
-                                    'has_chart': slide.has_chart,
-                                    'has_image': slide.has_image,
-                                    'has_table': len(slide.tables) > 0
-                                }
-                            })
-
-                        embeddings.add_slides_batch(slides_to_embed)
-                        total_items = result.total_slides
-
-                    elif file_ext == 'pdf':
-                        # Process PDF
-                        from app.services.pdf_processor import PDFProcessor, create_page_embedding_content
-
-                        processor = PDFProcessor()
-                        result = processor.process_uploaded_file(uploaded_file)
-
-                        pages_to_embed = []
-                        for page in result.pages:
-                            page_id = f"{result.filename}_page_{page.page_number}"
-                            content = create_page_embedding_content(page.to_dict())
-                            pages_to_embed.append({
-                                'id': page_id,
-                                'content': content,
-                                'metadata': {
-                                    'filename': result.filename,
-                                    'slide_number': page.page_number,  # Use slide_number for consistency
-                                    'title': page.title or f"Page {page.page_number}",
-                                    'has_chart': False,
-                                    'has_image': False,
-                                    'has_table': len(page.tables) > 0
-                                }
-                            })
-
-                        embeddings.add_slides_batch(pages_to_embed)
-                        total_items = result.total_pages
-
-                    st.session_state.processed_file = {
-                        'name': uploaded_file.name,
-                        'data': result,
-                        'type': file_ext
-                    }
-                    st.session_state.embeddings_ready = True
-                    st.session_state.messages = []
-
-                    st.success(t('upload_success').format(slides=total_items, filename=uploaded_file.name))
-                    st.rerun()
-
-                except Exception as e:
-                    st.error(t('upload_error').format(error=str(e)))
-
-    # Steps
-    st.markdown("---")
+    placeholder = st.empty()
+    with placeholder.container():
+        # Header (static HTML: st.html skips the markdown parser)
+        st.html(welcome_header_html(lang))
 
-    col1, col2, col3 = st.columns(3)
+        # File uploader - supports PPTX and PDF
+        uploaded_file = st.file_uploader(
+            t['upload_label'],
+            type=["pptx", "pdf"],
+            help=t['upload_help'],
+            key="main_uploader"
+        )
 
-    with col1:
-        st.markdown(f"""
-            <div class="step-card">
-                <div class="step-number">1</div>
-                <div class="step-title">{t('step_upload')}</div>
-                <div class="step-desc">{t('step_upload_desc')}</div>
-            </div>
-        """, unsafe_allow_html=True)
+        if uploaded_file is None or not process_upload(uploaded_file, lang):
+            # Divider and steps, laid out by the .steps-grid CSS grid
+            st.html(steps_html(lang))
+            return
 
-    with col2:
-        st.markdown(f"""
-            <div class="step-card">
-                <div class="step-number">2</div>
-                <div class="step-title">{t('step_process')}</div>
-                <div class="step-desc">{t('step_process_desc')}</div>
-            </div>
-        """, unsafe_allow_html=True)
+    # A file was just loaded: swap in the chat view within this same run
+    # rather than paying for a full st.rerun()
+    placeholder.empty()
+    render_chat_state(lang)
 
-    with col3:
-        st.markdown(f"""
-            <div class="step-card">
-                <div class="step-number">3</div>
-                <div class="step-title">{t('step_ask')}</div>
-                <div class="step-desc">{t('step_ask_desc')}</div>
-            </div>
-        """, unsafe_allow_html=True)
+
+def _start_new_upload():
+    """Drop the loaded file and go back to the welcome state."""
+    from app.components.chat import reset_chat
+
+    st.session_state.processed_file = None
+    st.session_state.embeddings_ready = False
+    reset_chat()
 
 
 def render_chat_state(lang: str):
     """Render the chat interface after file upload."""
-    t = lambda key: get_text(key, lang)
+    from app.components.chat import render_chat_interface, reset_chat
+
+    t = get_translations(lang)
 
-    file_data = st.session_state.get('processed_file', {})
-    filename = file_data.get('name', '')
-    file_type = file_data.get('type', 'pptx')
-    data = file_data.get('data')
+    file_data = st.session_state.processed_file
+    filename = file_data.name
+    data = file_data.data
 
     # Get page/slide count based on file type
-    if file_type == 'pdf':
+    if file_data.file_type == 'pdf':
         slide_count = data.total_pages if data else 0
     else:
         slide_count = data.total_slides if data else 0
@@ -775,17 +671,12 @@ def render_chat_state(lang: str):
         if st.button("📄 " + filename[:15] + "...", key="file_info", use_container_width=True):
             pass  # Could show file details
 
+    # Callbacks run before the click's own rerun, so no st.rerun() is needed
     with col2:
-        if st.button(f"🗑️ {t('clear_chat')}", key="clear_chat", use_container_width=True):
-            st.session_state.messages = []
-            st.rerun()
+        st.button(f"🗑️ {t['clear_chat']}", key="clear_chat", on_click=reset_chat, use_container_width=True)
 
     with col3:
-        if st.button("📤 Upload New", key="new_upload", use_container_width=True):
-            st.session_state.processed_file = None
-            st.session_state.embeddings_ready = False
-            st.session_state.messages = []
-            st.rerun()
+        st.button("📤 Upload New", key="new_upload", on_click=_start_new_upload, use_container_width=True)
 
     st.markdown("---")
 
@@ -798,19 +689,24 @@ def main():
     initialize_session_state()
 
     lang = st.session_state.language
-    is_rtl = lang == 'ar'
-    is_dark = st.session_state.dark_mode
-    t = lambda key: get_text(key, lang)
 
     # Get file info
-    has_file = st.session_state.get('processed_file') is not None
-    filename = st.session_state.get('processed_file', {}).get('name', '') if has_file else ""
-
-    # Apply CSS
-    st.markdown(get_app_css(is_dark, is_rtl), unsafe_allow_html=True)
+    processed = st.session_state.get('processed_file')
+    has_file = processed is not None
+    filename = processed.name if has_file else ""
+
+    # Apply CSS: fonts and static rules once per session; the theme
+    # variables are injected by the navbar's theme fragment
+    if not st.session_state.get('_css_loaded'):
+        inject_head(
+            body_class(CSS_SCOPE_CLASS),
+            head_style("dd-fonts", _FONT_CSS) if _FONT_CSS else head_stylesheet("dd-fonts", FONTS_URL),
+            head_style("dd-static-css", _STATIC_CSS)
+        )
+        st.session_state._css_loaded = True
 
     # Render navbar
-    render_navbar(lang, is_dark, has_file, filename)
+    render_navbar(lang, has_file, filename)
 
     # Main content
     if has_file:
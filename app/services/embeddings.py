@@ -5,12 +5,286 @@ Handles text embedding generation and vector storage using ChromaDB.
 """
 
 import os
-from typing import List, Dict, Any, Optional
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import repeat
+from typing import List, Dict, Any, Generic, Optional, Sequence, Tuple, TypeVar
 from pathlib import Path
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 
+from .keyword_index import BM25Index
+
+
+# Metadata value types ChromaDB stores as-is
+_META_SCALARS = (str, int, float, bool)
+
+# Result fields returned by search() unless a caller asks for fewer
+SEARCH_INCLUDE = ("documents", "metadatas", "distances")
+
+# Documents embedded and upserted per ChromaDB call in add_slides_batch
+UPSERT_BATCH_SIZE = 256
+
+# Keyword matches hybrid_search adds to the semantic candidates
+HYBRID_CANDIDATES = 50
+
+# MiniLM is trained for cosine similarity, so distances are 1 - cos_sim
+# (0 = identical, 1 = unrelated). HNSW is tuned for recall as the index
+# grows across uploads.
+COLLECTION_METADATA = {
+    "description": "Slide content embeddings",
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 200,
+    "hnsw:M": 32,
+    "hnsw:search_ef": 64,
+}
+
+
+# Process-wide embedding function (the ONNX MiniLM session), see _get_embed_fn
+_EMBED_FN = None
+_EMBED_FN_LOCK = threading.Lock()
+
+
+def _get_embed_fn():
+    """Get the shared embedding function, loading the model on first use."""
+    global _EMBED_FN
+    if _EMBED_FN is None:
+        with _EMBED_FN_LOCK:
+            if _EMBED_FN is None:
+                # Default embedding function (all-MiniLM-L6-v2): a good
+                # balance of speed and quality for semantic search
+                _EMBED_FN = embedding_functions.DefaultEmbeddingFunction()
+    return _EMBED_FN
+
+
+def _clean_meta(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce metadata values to types ChromaDB accepts (None -> "", others -> str)."""
+    return {
+        key: value if isinstance(value, _META_SCALARS) else ("" if value is None else str(value))
+        for key, value in metadata.items()
+    }
+
+
+def _chat_snippet(slide_number: Any, document: str) -> str:
+    """A slide's line of chat context: its number and the start of its content."""
+    return f"[Slide {slide_number}] {document[:500]}"
+
+
+def _stored_meta(metadata: Dict[str, Any], document: str) -> Dict[str, Any]:
+    """Metadata as written to ChromaDB, with the slide's chat snippet precomputed."""
+    stored = _clean_meta(metadata)
+    stored['chat_snippet'] = _chat_snippet(stored.get('slide_number', '?'), document)
+    return stored
+
+
+class EmbeddingCache:
+    """
+    SQLite store of document embeddings keyed by content hash.
+
+    Re-uploading a deck only embeds slides whose text changed. Keys are
+    blake2b digests personalized with the model name, so a different
+    embedding model never reads these vectors.
+    """
+
+    MODEL_TAG = b"all-MiniLM-L6-v2"
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeds (hash BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+            )
+
+    @classmethod
+    def key(cls, document: str) -> bytes:
+        """Content hash of a document."""
+        return hashlib.blake2b(document.encode(), digest_size=16, person=cls.MODEL_TAG).digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Fetch the cached vectors among keys in one query."""
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT hash, vec FROM embeds WHERE hash IN ({placeholders})", keys
+            ).fetchall()
+        return {key: np.frombuffer(vec, dtype=np.float32) for key, vec in rows}
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """Store float32 vectors, parallel to keys."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeds (hash, vec) VALUES (?, ?)",
+                zip(keys, (vector.tobytes() for vector in vectors))
+            )
+
+
+@dataclass(slots=True, frozen=True)
+class SlideHit:
+    """A search result, with the metadata fields callers read lifted out."""
+    id: str
+    content: str
+    metadata: Dict[str, Any]
+    distance: float
+    slide_number: Any = '?'
+    title: str = ''
+    filename: str = ''
+
+    @property
+    def chat_snippet(self) -> str:
+        """The snippet stored at ingestion (built here for older collections)."""
+        return self.metadata.get('chat_snippet') or _chat_snippet(self.slide_number, self.content)
+
+
+# Payload a QueryCache stores per query; the cache never looks inside it
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class _CacheEntry(Generic[T]):
+    """A cached payload and the query embedding that produced it."""
+    results: T
+    embedding: np.ndarray
+    n_results: int
+    filter_key: str
+    expires: float
+
+
+class QueryCache(Generic[T]):
+    """
+    LRU + TTL cache of per-query results.
+
+    The payload is opaque to the cache: EmbeddingsService stores search
+    hits, QueryEngine whole answers. A query hits either on its normalized
+    text or, failing that, on a cached query whose embedding has cosine
+    similarity >= sim_threshold (for the same n_results and metadata filter).
+    """
+
+    def __init__(
+        self,
+        max_size: int = 512,
+        ttl_seconds: float = 300.0,
+        sim_threshold: float = 0.95
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.sim_threshold = sim_threshold
+
+        self._entries: "OrderedDict[Tuple[str, int, str], _CacheEntry[T]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        query: str,
+        n_results: int,
+        filter_metadata: Optional[Dict[str, Any]],
+        include: Tuple[str, ...] = ()
+    ) -> Tuple[str, int, str]:
+        """Normalize a search call into a cache key."""
+        filter_key = json.dumps(filter_metadata, sort_keys=True, default=str) if filter_metadata else ""
+        # Results only match calls that asked for the same fields
+        filter_key += "|" + ",".join(include)
+        return (" ".join(query.lower().split()), n_results, filter_key)
+
+    def get(self, key: Tuple[str, int, str]) -> Optional[T]:
+        """Exact-match lookup; counts a hit but not a miss (see get_similar)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.results
+
+    def get_similar(
+        self,
+        key: Tuple[str, int, str],
+        embedding: np.ndarray
+    ) -> Optional[T]:
+        """
+        Lookup by query embedding similarity.
+
+        Args:
+            key: Cache key of the query (n_results and filter must match)
+            embedding: L2-normalized query embedding
+
+        Returns:
+            The cached payload, or None on a miss
+        """
+        _, n_results, filter_key = key
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                (cached_key, entry) for cached_key, entry in self._entries.items()
+                if entry.n_results == n_results
+                and entry.filter_key == filter_key
+                and entry.expires >= now
+            ]
+            if candidates:
+                # One matrix-vector product scores every candidate
+                similarities = np.stack([entry.embedding for _, entry in candidates]) @ embedding
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.sim_threshold:
+                    cached_key, entry = candidates[best]
+                    self._entries.move_to_end(cached_key)
+                    self.hits += 1
+                    return entry.results
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        key: Tuple[str, int, str],
+        embedding: np.ndarray,
+        results: T
+    ) -> None:
+        """Store a query's payload, evicting the least recently used entry if full."""
+        _, n_results, filter_key = key
+        with self._lock:
+            self._entries[key] = _CacheEntry(
+                results=results,
+                embedding=embedding,
+                n_results=n_results,
+                filter_key=filter_key,
+                expires=time.monotonic() + self.ttl_seconds
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry (the collection changed)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries)
+            }
+
 
 class EmbeddingsService:
     """Manages text embeddings and vector storage."""
@@ -18,25 +292,45 @@ class EmbeddingsService:
     def __init__(
         self,
         persist_dir: Optional[str] = None,
-        collection_name: str = "slides"
+        collection_name: str = "slides",
+        cache_config: Optional[Dict[str, Any]] = None
     ):
+        """
+        Args:
+            persist_dir: ChromaDB storage path (default: $CHROMA_PERSIST_DIR)
+            collection_name: Name of the slide collection
+            cache_config: QueryCache options (max_size, ttl_seconds, sim_threshold)
+        """
         self.persist_dir = persist_dir or os.getenv("CHROMA_PERSIST_DIR", "./data/chroma")
         Path(self.persist_dir).mkdir(parents=True, exist_ok=True)
 
         # Initialize ChromaDB with persistence
         self.client = chromadb.PersistentClient(path=self.persist_dir)
 
-        # Use default embedding function (all-MiniLM-L6-v2)
-        # This is a good balance of speed and quality for semantic search
-        self.embedding_fn = embedding_functions.DefaultEmbeddingFunction()
+        # Shared by every service instance in the process
+        self.embedding_fn = _get_embed_fn()
 
         # Get or create collection
         self.collection = self.client.get_or_create_collection(
             name=collection_name,
             embedding_function=self.embedding_fn,
-            metadata={"description": "Slide content embeddings"}
+            metadata=COLLECTION_METADATA
         )
 
+        # Repeated or rephrased questions skip embedding + HNSW search
+        self.query_cache: QueryCache[List[SlideHit]] = QueryCache(**(cache_config or {}))
+        # Bumped on every write, so callers caching derived results
+        # (e.g. QueryEngine answers) can tell when theirs went stale
+        self.generation = 0
+
+        # BM25 over every stored document, rebuilt lazily after writes
+        self._keyword_index: Optional[BM25Index] = None
+        self._keyword_generation = -1
+        self._keyword_lock = threading.Lock()
+
+        # Unchanged documents skip the model on re-upload
+        self.embed_cache = EmbeddingCache(os.path.join(self.persist_dir, "embed_cache.sqlite3"))
+
     def add_slide(
         self,
         slide_id: str,
@@ -51,68 +345,99 @@ class EmbeddingsService:
             content: Text content to embed
             metadata: Additional metadata (slide_number, filename, etc.)
         """
-        # Ensure metadata values are valid types for ChromaDB
-        clean_metadata = {}
-        for key, value in metadata.items():
-            if isinstance(value, (str, int, float, bool)):
-                clean_metadata[key] = value
-            elif isinstance(value, list):
-                clean_metadata[key] = str(value)
-            elif value is None:
-                clean_metadata[key] = ""
-            else:
-                clean_metadata[key] = str(value)
-
         self.collection.upsert(
             ids=[slide_id],
             documents=[content],
-            metadatas=[clean_metadata]
+            metadatas=[_stored_meta(metadata, content)]
         )
+        self._collection_changed()
 
     def add_slides_batch(
         self,
-        slides: List[Dict[str, Any]]
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
     ) -> None:
         """
         Add multiple slides to the vector store.
 
+        Documents are embedded in one batched call per UPSERT_BATCH_SIZE
+        chunk and upserted with their L2-normalized vectors, so ChromaDB
+        doesn't run the embedding function itself. Vectors of documents
+        seen before come from the embedding cache.
+
         Args:
-            slides: List of dicts with 'id', 'content', and 'metadata' keys
+            ids: Unique identifier for each slide
+            documents: Text content to embed, parallel to ids
+            metadatas: Metadata dicts, parallel to ids
         """
-        if not slides:
+        if not ids:
             return
 
-        ids = []
-        documents = []
-        metadatas = []
-
-        for slide in slides:
-            ids.append(slide['id'])
-            documents.append(slide['content'])
-
-            # Clean metadata
-            clean_metadata = {}
-            for key, value in slide.get('metadata', {}).items():
-                if isinstance(value, (str, int, float, bool)):
-                    clean_metadata[key] = value
-                elif value is None:
-                    clean_metadata[key] = ""
-                else:
-                    clean_metadata[key] = str(value)
-            metadatas.append(clean_metadata)
+        for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+            end = start + UPSERT_BATCH_SIZE
+            chunk = documents[start:end]
+            vectors = self._embed_documents(chunk)
+            self.collection.upsert(
+                ids=ids[start:end],
+                documents=chunk,
+                embeddings=vectors.tolist(),
+                metadatas=[
+                    _stored_meta(metadata, document)
+                    for metadata, document in zip(metadatas[start:end], chunk)
+                ]
+            )
+        self._collection_changed()
+
+    def _collection_changed(self) -> None:
+        """Invalidate cached search results after a write."""
+        self.query_cache.clear()
+        self.generation += 1
+
+    def _embed_documents(self, documents: List[str]) -> np.ndarray:
+        """
+        Embed documents, only running the model on ones not in the embedding cache.
 
-        self.collection.upsert(
-            ids=ids,
-            documents=documents,
-            metadatas=metadatas
-        )
+        Args:
+            documents: Texts to embed
+
+        Returns:
+            L2-normalized float32 vectors, one row per document
+        """
+        keys = [EmbeddingCache.key(document) for document in documents]
+        cached = self.embed_cache.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+
+        fresh = None
+        if missing:
+            fresh = np.asarray(self.embedding_fn([documents[i] for i in missing]), dtype=np.float32)
+            fresh /= np.maximum(np.linalg.norm(fresh, axis=1, keepdims=True), 1e-12)
+            self.embed_cache.put_many([keys[i] for i in missing], fresh)
+            if len(missing) == len(documents):
+                return fresh
+
+        vectors = np.empty((len(documents), next(iter(cached.values())).shape[0]), dtype=np.float32)
+        for i, key in enumerate(keys):
+            if key in cached:
+                vectors[i] = cached[key]
+        if missing:
+            vectors[missing] = fresh
+        return vectors
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed query texts as L2-normalized float32 rows."""
+        embeddings = np.asarray(self.embedding_fn(queries), dtype=np.float32)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
 
     def search(
         self,
         query: str,
         n_results: int = 5,
-        filter_metadata: Optional[Dict[str, Any]] = None
-    ) -> List[Dict[str, Any]]:
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        include: Tuple[str, ...] = SEARCH_INCLUDE,
+        embedding: Optional[np.ndarray] = None
+    ) -> List[SlideHit]:
         """
         Search for relevant slides using semantic similarity.
 
@@ -120,34 +445,197 @@ class EmbeddingsService:
             query: Search query text
             n_results: Number of results to return
             filter_metadata: Optional metadata filters
+            include: Result fields to fetch; pass () when only ids are
+                needed so ChromaDB doesn't load documents or metadata
+            embedding: The query's vector from embed_queries, if the caller
+                already has it
 
         Returns:
             List of matching slides with scores
         """
+        embeddings = None if embedding is None else embedding[np.newaxis]
+        return self.search_many([query], n_results, filter_metadata, include, embeddings)[0]
+
+    def search_many(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        include: Tuple[str, ...] = SEARCH_INCLUDE,
+        embeddings: Optional[np.ndarray] = None
+    ) -> List[List[SlideHit]]:
+        """
+        Search for several queries with at most one embedding call and one
+        ChromaDB query.
+
+        Queries answered by the query cache are left out of the backend
+        call and stitched back into their positions.
+
+        Args:
+            queries: Search query texts
+            n_results: Number of results to return per query
+            filter_metadata: Optional metadata filters
+            include: Result fields to fetch (see search)
+            embeddings: Vectors from embed_queries, parallel to queries;
+                embedded here when not given
+
+        Returns:
+            One result list per query, in order
+        """
+        out: List[Optional[List[SlideHit]]] = [None] * len(queries)
+        keys = [QueryCache.make_key(query, n_results, filter_metadata, include) for query in queries]
+
+        for i, key in enumerate(keys):
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                out[i] = list(cached)
+
+        pending = [i for i, results in enumerate(out) if results is None]
+        if not pending:
+            return out
+
+        # Embed once: the vectors serve both the similarity lookup and the query
+        if embeddings is None:
+            embeddings = self.embed_queries([queries[i] for i in pending])
+        else:
+            embeddings = embeddings[pending]
+
+        remaining = []
+        for i, embedding in zip(pending, embeddings):
+            cached = self.query_cache.get_similar(keys[i], embedding)
+            if cached is not None:
+                out[i] = list(cached)
+            else:
+                remaining.append((i, embedding))
+
+        if not remaining:
+            return out
+
         results = self.collection.query(
-            query_texts=[query],
+            query_embeddings=[embedding.tolist() for _, embedding in remaining],
             n_results=n_results,
-            where=filter_metadata
+            where=filter_metadata,
+            include=list(include)
         )
 
-        # Format results
-        formatted = []
-        if results and results['ids'] and results['ids'][0]:
-            for i, slide_id in enumerate(results['ids'][0]):
-                formatted.append({
-                    'id': slide_id,
-                    'content': results['documents'][0][i] if results['documents'] else "",
-                    'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                    'distance': results['distances'][0][i] if results['distances'] else 0
-                })
-
-        return formatted
-
-    def get_slide(self, slide_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific slide by ID."""
+        for row, (i, embedding) in enumerate(remaining):
+            formatted = _format_query_row(results, row)
+            self.query_cache.put(keys[i], embedding, formatted)
+            out[i] = list(formatted)
+
+        return out
+
+    def keyword_index(self) -> BM25Index:
+        """The BM25 index of the collection, rebuilt if it changed since."""
+        with self._keyword_lock:
+            if self._keyword_index is None or self._keyword_generation != self.generation:
+                generation = self.generation
+                stored = self.collection.get(include=["documents"])
+                self._keyword_index = BM25Index(stored['ids'], stored['documents'] or [])
+                self._keyword_generation = generation
+            return self._keyword_index
+
+    def search_subset(
+        self,
+        query: str,
+        candidate_ids: List[str],
+        n_results: int = 5,
+        embedding: Optional[np.ndarray] = None
+    ) -> List[SlideHit]:
+        """
+        Rank only the given slides by cosine similarity to the query.
+
+        Their stored vectors are fetched in one call and scored with a
+        single matrix-vector product, without touching the HNSW index.
+
+        Args:
+            query: Search query text
+            candidate_ids: Slides to rank
+            n_results: Number of results to return
+            embedding: The query's vector from embed_queries, if the caller
+                already has it
+
+        Returns:
+            The best n_results candidates, nearest first
+        """
+        if not candidate_ids:
+            return []
+        if embedding is None:
+            embedding = self.embed_queries([query])[0]
+
+        stored = self.collection.get(
+            ids=candidate_ids,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        if not stored['ids']:
+            return []
+
+        vectors = np.asarray(stored['embeddings'], dtype=np.float32)
+        # Slides added through add_slide were embedded by ChromaDB, unnormalized
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        distances = 1.0 - vectors @ embedding
+
+        order = np.argsort(distances)[:n_results]
+        return _format_query_row(
+            {
+                'ids': [[stored['ids'][i] for i in order]],
+                'documents': [[stored['documents'][i] for i in order]],
+                'metadatas': [[stored['metadatas'][i] for i in order]],
+                'distances': [distances[order].tolist()]
+            },
+            0
+        )
+
+    def hybrid_search(
+        self,
+        query: str,
+        n_results: int = 5,
+        expansions: Sequence[str] = (),
+        embedding: Optional[np.ndarray] = None
+    ) -> List[SlideHit]:
+        """
+        Two-pass search: semantic and BM25 candidates, reranked together.
+
+        The semantic top n_results are merged with the best keyword
+        matches, so keyword-critical terms (slide numbers, product names)
+        can pull in slides the embeddings missed without dropping any the
+        embeddings found; the union is then ordered by exact cosine
+        similarity. Small collections skip the keyword pass.
+
+        Args:
+            query: Search query text
+            n_results: Number of results to return
+            expansions: Alternative phrasings (e.g. from expand_query) that
+                also count for the keyword pass
+            embedding: The query's vector from embed_queries, if the caller
+                already has it
+
+        Returns:
+            List of matching slides with scores
+        """
+        if embedding is None:
+            embedding = self.embed_queries([query])[0]
+        semantic = self.search(query, n_results=n_results, embedding=embedding)
+
+        index = self.keyword_index()
+        if len(index) <= HYBRID_CANDIDATES:
+            return semantic
+
+        candidates = dict.fromkeys(hit.id for hit in semantic)
+        candidates.update(dict.fromkeys(index.top_n([query, *expansions], HYBRID_CANDIDATES)))
+        if len(candidates) == len(semantic):
+            return semantic
+        return self.search_subset(query, list(candidates), n_results, embedding)
+
+    def get_slide(
+        self,
+        slide_id: str,
+        include: Tuple[str, ...] = ("documents", "metadatas")
+    ) -> Optional[Dict[str, Any]]:
+        """Get a specific slide by ID, fetching only the `include` fields."""
         results = self.collection.get(
             ids=[slide_id],
-            include=['documents', 'metadatas']
+            include=list(include)
         )
 
         if results and results['ids']:
@@ -168,16 +656,20 @@ class EmbeddingsService:
 
         if results and results['ids']:
             self.collection.delete(ids=results['ids'])
+            self._collection_changed()
 
     def clear_collection(self) -> None:
         """Clear all data from the collection."""
-        # Delete and recreate collection
-        self.client.delete_collection(self.collection.name)
+        # Delete and recreate collection (this also moves collections
+        # persisted before the cosine switch onto COLLECTION_METADATA)
+        name = self.collection.name
+        self.client.delete_collection(name)
         self.collection = self.client.get_or_create_collection(
-            name="slides",
+            name=name,
             embedding_function=self.embedding_fn,
-            metadata={"description": "Slide content embeddings"}
+            metadata=COLLECTION_METADATA
         )
+        self._collection_changed()
 
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store."""
@@ -186,6 +678,30 @@ class EmbeddingsService:
             "persist_dir": self.persist_dir
         }
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get query cache hit/miss/eviction statistics."""
+        return self.query_cache.stats()
+
+
+def _format_query_row(results: Dict[str, Any], row: int) -> List[SlideHit]:
+    """Format one query's slice of a ChromaDB query result."""
+    if not results or not results['ids'] or not results['ids'][row]:
+        return []
+
+    ids = results['ids'][row]
+    # Fields left out of `include` come back as None; substitute defaults
+    # once instead of branching per hit
+    documents = results['documents'][row] if results['documents'] else repeat("")
+    metadatas = results['metadatas'][row] if results['metadatas'] else repeat({})
+    distances = results['distances'][row] if results['distances'] else repeat(0.0)
+    return [
+        SlideHit(
+            slide_id, doc, meta, dist,
+            meta.get('slide_number', '?'), meta.get('title', ''), meta.get('filename', '')
+        )
+        for slide_id, doc, meta, dist in zip(ids, documents, metadatas, distances)
+    ]
+
 
 def create_slide_embedding_content(slide_data: Dict[str, Any]) -> str:
     """
@@ -193,36 +709,62 @@ def create_slide_embedding_content(slide_data: Dict[str, Any]) -> str:
 
     This function formats slide content to maximize semantic search quality.
     """
-    parts = []
+    text = slide_data.get('text_joined')
+    if text is None:
+        text = slide_data.get('text_content')
+        if isinstance(text, list):
+            text = " ".join(text)
 
+    # Flatten tables to hashable rows so the formatting can be memoized.
+    # Cells extracted from slides are already strings; map(str) only
+    # converts the odd non-string cell.
+    join_cells = " | ".join
+    table_rows = tuple(
+        join_cells(map(str, row))
+        for table in slide_data.get('tables') or ()
+        if isinstance(table, dict) and table.get('rows')
+        for row in table['rows']
+    )
+
+    return _slide_embedding_content(
+        slide_data.get('title') or "",
+        text or "",
+        table_rows,
+        slide_data.get('raw_notes') or "",
+        bool(slide_data.get('has_chart')),
+        bool(slide_data.get('has_image'))
+    )
+
+
+@lru_cache(maxsize=2048)
+def _slide_embedding_content(
+    title: str,
+    text: str,
+    table_rows: Tuple[str, ...],
+    notes: str,
+    has_chart: bool,
+    has_image: bool
+) -> str:
+    """Format slide embedding content; repeated slides hit the cache."""
     # Title is important for search
-    if slide_data.get('title'):
-        parts.append(f"Title: {slide_data['title']}")
+    parts = ["Title: " + title] if title else []
 
     # Main text content
-    if slide_data.get('text_content'):
-        text = slide_data['text_content']
-        if isinstance(text, list):
-            text = " ".join(text)
+    if text:
         parts.append(text)
 
     # Table content (converted to readable format)
-    if slide_data.get('tables'):
-        for table in slide_data['tables']:
-            if isinstance(table, dict) and table.get('rows'):
-                # Flatten table to text
-                for row in table['rows']:
-                    parts.append(" | ".join(str(cell) for cell in row))
+    parts += table_rows
 
     # Notes can contain valuable context
-    if slide_data.get('raw_notes'):
-        parts.append(f"Notes: {slide_data['raw_notes']}")
+    if notes:
+        parts.append("Notes: " + notes)
 
     # Visual indicators
-    if slide_data.get('has_chart'):
+    if has_chart:
         parts.append("[Contains chart/visualization]")
 
-    if slide_data.get('has_image'):
+    if has_image:
         parts.append("[Contains image]")
 
     return " ".join(parts)
@@ -0,0 +1,113 @@
+"""
+Keyword Index Service
+
+In-memory BM25 index over slide documents, used as the lexical
+half of hybrid retrieval.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+# Word tokens; \w is Unicode-aware, so Arabic text tokenizes too
+_TOKEN = re.compile(r"\w+")
+
+# Function words in both UI languages. They match nearly every slide, so
+# left in they would fill the candidate list with arbitrary slides.
+STOPWORDS = frozenset("""
+    a about above after again all also am an and any are as at be because
+    been before being below between both but by can could did do does doing
+    down during each few for from further had has have having he her here
+    hers him his how i if in into is it its itself just me more most my no
+    nor not now of off on once only or other our ours out over own same she
+    should so some such than that the their theirs them then there these
+    they this those through to too under until up very was we were what
+    when where which while who whom why will with would you your yours
+    في من إلى الى على عن مع هذا هذه ذلك تلك التي الذي الذين هو هي هم
+    أن ان إن كان كانت يكون ما ماذا لا لم لن هل أو او ثم كل بين عند قد
+    بعد قبل حتى أي اي كيف متى أين اين لماذا
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a text, without stopwords."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of documents.
+
+    Each term's postings are stored as parallel NumPy arrays with the
+    BM25 term-frequency weight already applied, so scoring a query is one
+    scaled scatter-add per query term.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        """
+        Args:
+            ids: Document ids, returned by top_n
+            documents: Document texts, parallel to ids
+            k1: Term-frequency saturation
+            b: Document length normalization
+        """
+        self.ids = list(ids)
+
+        counts = [Counter(tokenize(doc)) for doc in documents]
+        lengths = np.fromiter((sum(c.values()) for c in counts), dtype=np.float32, count=len(counts))
+        avg_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        norms = k1 * (1.0 - b + b * lengths / avg_length)
+
+        postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        for doc_index, doc_counts in enumerate(counts):
+            for term, tf in doc_counts.items():
+                docs, weights = postings.setdefault(term, ([], []))
+                docs.append(doc_index)
+                weights.append(tf * (k1 + 1.0) / (tf + norms[doc_index]))
+
+        n_docs = len(self.ids)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, (docs, weights) in postings.items():
+            # Lucene's idf: never negative, so very common terms still count a little
+            idf = np.log1p((n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            self._postings[term] = (
+                np.asarray(docs, dtype=np.int32),
+                np.asarray(weights, dtype=np.float32) * np.float32(idf)
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, queries: Sequence[str]) -> np.ndarray:
+        """
+        BM25 score of every document, taking the best over several queries
+        (e.g. a question and its expansions).
+        """
+        best = np.zeros(len(self.ids), dtype=np.float32)
+        for query in queries:
+            scores = np.zeros(len(self.ids), dtype=np.float32)
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                if posting is not None:
+                    docs, weights = posting
+                    scores[docs] += weights
+            np.maximum(best, scores, out=best)
+        return best
+
+    def top_n(self, queries: Sequence[str], n: int) -> List[str]:
+        """Ids of the n best-scoring documents that match any query term."""
+        scores = self.scores(queries)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > n:
+            matched = matched[np.argpartition(scores[matched], -n)[-n:]]
+        order = matched[np.argsort(scores[matched])[::-1]]
+        return [self.ids[i] for i in order]
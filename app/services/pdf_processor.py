@@ -5,12 +5,26 @@ Extracts text and tables from PDF documents.
 """
 
 import io
-from typing import List, Optional
+import os
+import threading
+import multiprocessing
+from multiprocessing.util import Finalize
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from dataclasses import dataclass, field
 import pdfplumber
 
+# pdfium's text layer is much faster than pdfplumber's layout analysis;
+# without it, pdfplumber extracts the text as well
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
 
-@dataclass
+
+@dataclass(slots=True)
 class PDFPage:
     """Represents a single PDF page."""
     page_number: int
@@ -27,7 +41,7 @@ class PDFPage:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcessedPDF:
     """Represents a processed PDF document."""
     filename: str
@@ -42,89 +56,222 @@ class ProcessedPDF:
         }
 
 
+# Pages per process-pool task, and the page count below which the pool's
+# startup cost outweighs spreading pages over cores
+PAGES_PER_TASK = 4
+PARALLEL_MIN_PAGES = 16
+
+# pdfium is not thread-safe; serializes concurrent in-process extraction
+_PDFIUM_LOCK = threading.Lock()
+
+# Documents opened once per pool worker by _init_worker
+_worker_pdf = None
+_worker_pdfium = None
+
+# Pool workers start from a clean interpreter rather than a fork of
+# Streamlit's threaded server process; forkserver is POSIX-only
+_POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
 class PDFProcessor:
     """Processes PDF files and extracts content."""
 
     def process_uploaded_file(self, uploaded_file) -> ProcessedPDF:
         """Process an uploaded PDF file."""
-        file_bytes = uploaded_file.read()
-        uploaded_file.seek(0)
-
-        return self.process_bytes(file_bytes, uploaded_file.name)
+        # getvalue() hands back the upload's own bytes without copying or
+        # moving the read position. Bytes (not the stream) are needed anyway:
+        # pool workers receive them, and pdfplumber (through a BytesIO) and
+        # pdfium each read them independently of one file position
+        return self.process_bytes(uploaded_file.getvalue(), uploaded_file.name)
 
     def process_bytes(self, file_bytes: bytes, filename: str) -> ProcessedPDF:
-        """Process PDF from bytes."""
-        pages = []
+        """
+        Process PDF from bytes.
 
+        Layout analysis is CPU-bound and independent per page, so larger
+        documents are spread over a process pool.
+        """
         with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
             total_pages = len(pdf.pages)
+            workers = min(os.cpu_count() or 1, -(-total_pages // PAGES_PER_TASK))
+
+            if total_pages < PARALLEL_MIN_PAGES or workers < 2:
+                with _PDFIUM_LOCK if pdfium else nullcontext():
+                    doc = pdfium.PdfDocument(file_bytes) if pdfium else None
+                    try:
+                        pages = [
+                            _extract_page(page, i, doc[i - 1] if doc is not None else None)
+                            for i, page in enumerate(pdf.pages, 1)
+                        ]
+                    finally:
+                        if doc is not None:
+                            doc.close()
 
-            for i, page in enumerate(pdf.pages):
-                page_num = i + 1
-
-                # Extract text
-                text = page.extract_text() or ""
-                text_lines = [line.strip() for line in text.split('\n') if line.strip()]
-
-                # Try to get title from first significant line
-                title = None
-                for line in text_lines[:3]:
-                    if len(line) > 5 and len(line) < 100:
-                        title = line
-                        break
-
-                # Extract tables
-                tables = []
-                page_tables = page.extract_tables()
-                for table in page_tables:
-                    if table:
-                        # Convert table to markdown-like format
-                        table_str = self._table_to_string(table)
-                        if table_str:
-                            tables.append(table_str)
-
-                pdf_page = PDFPage(
-                    page_number=page_num,
-                    text_content=text_lines,
-                    tables=tables,
-                    title=title or f"Page {page_num}"
+                return ProcessedPDF(
+                    filename=filename,
+                    total_pages=total_pages,
+                    pages=pages
                 )
-                pages.append(pdf_page)
 
         return ProcessedPDF(
             filename=filename,
             total_pages=total_pages,
-            pages=pages
+            pages=_extract_pages_parallel(file_bytes, total_pages, workers)
+        )
+
+
+def _extract_page(page, page_num: int, pdfium_page=None) -> PDFPage:
+    """
+    Extract the text, title and tables of one page.
+
+    Args:
+        page: pdfplumber page
+        page_num: 1-based page number
+        pdfium_page: The same page opened with pypdfium2, if available;
+            used for the text
+
+    Returns:
+        The extracted page
+    """
+    # Extract text
+    if pdfium_page is not None:
+        textpage = pdfium_page.get_textpage()
+        text = textpage.get_text_range()
+        textpage.close()
+    else:
+        text = page.extract_text() or ""
+    text_lines = [line.strip() for line in text.split('\n') if line.strip()]
+
+    # Try to get title from first significant line
+    title = None
+    for line in text_lines[:3]:
+        if len(line) > 5 and len(line) < 100:
+            title = line
+            break
+
+    # Extract tables. pdfplumber's default lines strategy can only find a
+    # table where ruling lines are drawn, so lineless (prose) pages skip it.
+    tables = []
+    for table in (page.extract_tables() if _has_ruling_edges(page) else ()):
+        if table:
+            # Convert table to markdown-like format
+            table_str = _table_to_string(table)
+            if table_str:
+                tables.append(table_str)
+
+    return PDFPage(
+        page_number=page_num,
+        text_content=text_lines,
+        tables=tables,
+        title=title or f"Page {page_num}"
+    )
+
+
+def _table_to_string(table: List[List]) -> str:
+    """Convert a table to a string representation."""
+    if not table:
+        return ""
+
+    rows = []
+    for row in table:
+        cells = [str(cell or "").strip() for cell in row]
+        if any(cells):  # Only include non-empty rows
+            rows.append(" | ".join(cells))
+
+    return "\n".join(rows)
+
+
+def _has_ruling_edges(page) -> bool:
+    """Whether a pdfplumber page has enough line/rect edges to form a grid."""
+    return len(page.edges) >= 4 and len(page.horizontal_edges) >= 2
+
+
+def _init_worker(file_bytes: bytes):
+    """Pool initializer: open the document once per worker process."""
+    global _worker_pdf, _worker_pdfium
+    _worker_pdf = pdfplumber.open(io.BytesIO(file_bytes))
+    _worker_pdfium = pdfium.PdfDocument(file_bytes) if pdfium else None
+    # Pool workers leave through os._exit, which skips atexit; multiprocessing
+    # still runs its own finalizers on the way out
+    Finalize(None, _close_worker, exitpriority=10)
+
+
+def _close_worker():
+    """Close the documents opened by _init_worker."""
+    global _worker_pdf, _worker_pdfium
+    if _worker_pdfium is not None:
+        _worker_pdfium.close()
+        _worker_pdfium = None
+    if _worker_pdf is not None:
+        _worker_pdf.close()
+        _worker_pdf = None
+
+
+def _extract_page_range(page_range: Tuple[int, int]) -> List[PDFPage]:
+    """Pool task: extract pages [start, stop) of the worker's document."""
+    start, stop = page_range
+    return [
+        _extract_page(
+            _worker_pdf.pages[i],
+            i + 1,
+            _worker_pdfium[i] if _worker_pdfium is not None else None
         )
+        for i in range(start, stop)
+    ]
+
 
-    def _table_to_string(self, table: List[List]) -> str:
-        """Convert a table to a string representation."""
-        if not table:
-            return ""
+def _extract_pages_parallel(file_bytes: bytes, total_pages: int, workers: int) -> List[PDFPage]:
+    """
+    Extract all pages over a process pool, in page order.
 
-        rows = []
-        for row in table:
-            cells = [str(cell or "").strip() for cell in row]
-            if any(cells):  # Only include non-empty rows
-                rows.append(" | ".join(cells))
+    Args:
+        file_bytes: Raw PDF, sent to each worker once
+        total_pages: Number of pages in the document
+        workers: Pool size
 
-        return "\n".join(rows)
+    Returns:
+        One PDFPage per page
+    """
+    ranges = [
+        (start, min(start + PAGES_PER_TASK, total_pages))
+        for start in range(0, total_pages, PAGES_PER_TASK)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=_POOL_CONTEXT,
+        initializer=_init_worker,
+        initargs=(file_bytes,)
+    ) as executor:
+        return [page for chunk in executor.map(_extract_page_range, ranges) for page in chunk]
 
 
 def create_page_embedding_content(page_dict: dict) -> str:
     """Create embedding content from a PDF page dictionary."""
-    parts = []
+    return _page_embedding_content(
+        page_dict.get('title') or "",
+        page_dict.get('page_number', '?'),
+        tuple(page_dict.get('text_content') or ()),
+        tuple(page_dict.get('tables') or ())
+    )
+
 
-    if page_dict.get('title'):
-        parts.append(f"Title: {page_dict['title']}")
+@lru_cache(maxsize=2048)
+def _page_embedding_content(
+    title: str,
+    page_number,
+    text_content: Tuple[str, ...],
+    tables: Tuple[str, ...]
+) -> str:
+    """Format page embedding content; repeated pages hit the cache."""
+    parts = ["Title: " + title] if title else []
 
-    parts.append(f"Page: {page_dict.get('page_number', '?')}")
+    parts.append("Page: " + str(page_number))
 
-    if page_dict.get('text_content'):
-        parts.append("Content: " + " ".join(page_dict['text_content']))
+    if text_content:
+        parts.append("Content: " + " ".join(text_content))
 
-    if page_dict.get('tables'):
-        for i, table in enumerate(page_dict['tables'], 1):
-            parts.append(f"Table {i}: {table}")
+    parts += ["Table " + str(i) + ": " + table for i, table in enumerate(tables, 1)]
 
     return "\n".join(parts)
@@ -7,18 +7,41 @@ Converts slides to images for vision analysis.
 
 import io
 import os
+import mmap
 import base64
+import hashlib
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+from lxml import etree
 from pptx import Presentation
 from pptx.util import Inches
-from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.oxml.ns import namespaces, qn
+from pptx.shapes.graphfrm import GraphicFrame
 from PIL import Image
-import json
+import orjson
 
 
-@dataclass
+# Slide XML queries, compiled once. Like python-pptx's slide.shapes, they
+# only look at top-level shapes of the slide's shape tree.
+_NS = namespaces("a", "p", "c")
+_SHAPE_PARAGRAPHS = etree.XPath("./p:cSld/p:spTree/p:sp/p:txBody/a:p", namespaces=_NS)
+_PARAGRAPH_PARTS = etree.XPath("./a:r/a:t | ./a:fld/a:t | ./a:br", namespaces=_NS)
+_TABLE_FRAMES = etree.XPath("./p:cSld/p:spTree/p:graphicFrame[a:graphic/a:graphicData/a:tbl]", namespaces=_NS)
+_HAS_CHART = etree.XPath("boolean(./p:cSld/p:spTree/p:graphicFrame/a:graphic/a:graphicData/c:chart)", namespaces=_NS)
+_HAS_PICTURE = etree.XPath("boolean(./p:cSld/p:spTree/p:pic)", namespaces=_NS)
+_LINE_BREAK = qn("a:br")
+
+
+def _paragraph_text(paragraph) -> str:
+    """Text of an <a:p> element, as python-pptx's paragraph.text renders it."""
+    return "".join(
+        "\v" if part.tag == _LINE_BREAK else (part.text or "")
+        for part in _PARAGRAPH_PARTS(paragraph)
+    )
+
+
+@dataclass(slots=True)
 class TableData:
     """Represents an extracted table."""
     rows: List[List[str]]
@@ -29,24 +52,28 @@ class TableData:
         if not self.rows:
             return ""
 
-        lines = []
         headers = self.headers if self.headers else self.rows[0]
         data_rows = self.rows[1:] if not self.headers else self.rows
+        ncols = len(headers)
+
+        out = io.StringIO()
+        write = out.write
 
         # Header row
-        lines.append("| " + " | ".join(headers) + " |")
-        lines.append("| " + " | ".join(["---"] * len(headers)) + " |")
+        write("| " + " | ".join(headers) + " |\n")
+        write("| " + " | ".join(["---"] * ncols) + " |")
 
         # Data rows
         for row in data_rows:
-            # Pad row if necessary
-            padded_row = row + [""] * (len(headers) - len(row))
-            lines.append("| " + " | ".join(padded_row[:len(headers)]) + " |")
+            # Pad or trim only rows that don't already fit
+            if len(row) != ncols:
+                row = (row + [""] * (ncols - len(row)))[:ncols]
+            write("\n| " + " | ".join(row) + " |")
 
-        return "\n".join(lines)
+        return out.getvalue()
 
 
-@dataclass
+@dataclass(slots=True)
 class SlideContent:
     """Represents extracted content from a single slide."""
     slide_number: int
@@ -55,43 +82,77 @@ class SlideContent:
     tables: List[TableData] = field(default_factory=list)
     has_chart: bool = False
     has_image: bool = False
-    image_path: Optional[str] = None
-    image_base64: Optional[str] = None
+    image_path: Optional[str] = None  # Rendered slide image on disk, if any
     raw_notes: str = ""
 
+    def load_image_bytes(self) -> Optional[bytes]:
+        """Read the slide image from image_path (None when there is none)."""
+        if not self.image_path:
+            return None
+        with open(self.image_path, 'rb') as f:
+            return f.read()
+
+    def load_image_mmap(self) -> Optional[mmap.mmap]:
+        """
+        Map the slide image read-only, without copying it into memory.
+
+        Wrap it for PIL with Image.open(io.BytesIO(memoryview(mm))) or
+        hand memoryview(mm) to anything taking a buffer. The caller
+        closes the map.
+        """
+        if not self.image_path:
+            return None
+        with open(self.image_path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
     def get_full_text(self) -> str:
         """Get all text content as a single string."""
-        parts = []
-        if self.title:
-            parts.append(f"Title: {self.title}")
-        parts.extend(self.text_content)
-        for i, table in enumerate(self.tables):
-            parts.append(f"Table {i+1}:\n{table.to_markdown()}")
+        parts = ["Title: " + self.title] if self.title else []
+        parts += self.text_content
+        parts += [
+            "Table " + str(i) + ":\n" + table.to_markdown()
+            for i, table in enumerate(self.tables, 1)
+        ]
         if self.raw_notes:
-            parts.append(f"Notes: {self.raw_notes}")
+            parts.append("Notes: " + self.raw_notes)
         return "\n\n".join(parts)
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for serialization."""
-        return {
+    def to_dict(self, include_full_text: bool = True) -> Dict[str, Any]:
+        """
+        Convert to dictionary for serialization.
+
+        Args:
+            include_full_text: Also render 'full_text' (tables as markdown).
+                Embedding content doesn't use it, so batch callers skip it.
+        """
+        data = {
             "slide_number": self.slide_number,
             "title": self.title,
             "text_content": self.text_content,
+            # Joined once here so embedding helpers don't each re-join it
+            "text_joined": " ".join(self.text_content),
             "tables": [{"rows": t.rows, "headers": t.headers} for t in self.tables],
             "has_chart": self.has_chart,
             "has_image": self.has_image,
             "image_path": self.image_path,
             "raw_notes": self.raw_notes,
-            "full_text": self.get_full_text()
         }
+        if include_full_text:
+            data["full_text"] = self.get_full_text()
+        return data
+
+
+# SlideContent fields load() takes from JSON as-is (tables are rebuilt)
+_SLIDE_FIELDS = frozenset(f.name for f in fields(SlideContent)) - {"tables"}
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcessedPresentation:
     """Represents a fully processed PowerPoint file."""
     filename: str
     total_slides: int
     slides: List[SlideContent]
+    file_hash: str = ""  # Content digest of the source file, when known
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for serialization."""
@@ -103,34 +164,33 @@ class ProcessedPresentation:
 
     def save(self, output_path: str):
         """Save processed data to JSON file."""
-        with open(output_path, 'w') as f:
-            json.dump(self.to_dict(), f, indent=2)
+        # orjson serializes the dataclasses directly, without a to_dict() copy
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(self, option=orjson.OPT_INDENT_2))
 
     @classmethod
     def load(cls, input_path: str) -> 'ProcessedPresentation':
         """Load processed data from JSON file."""
-        with open(input_path, 'r') as f:
-            data = json.load(f)
-
-        slides = []
-        for s in data['slides']:
-            tables = [TableData(rows=t['rows'], headers=t.get('headers', []))
-                     for t in s.get('tables', [])]
-            slides.append(SlideContent(
-                slide_number=s['slide_number'],
-                title=s.get('title', ''),
-                text_content=s.get('text_content', []),
-                tables=tables,
-                has_chart=s.get('has_chart', False),
-                has_image=s.get('has_image', False),
-                image_path=s.get('image_path'),
-                raw_notes=s.get('raw_notes', '')
-            ))
+        with open(input_path, 'rb') as f:
+            data = orjson.loads(f.read())
+
+        # Keyword-splat known fields; derived keys such as full_text are dropped
+        slides = [
+            SlideContent(
+                **{key: value for key, value in s.items() if key in _SLIDE_FIELDS},
+                tables=[
+                    TableData(rows=t['rows'], headers=t.get('headers', []))
+                    for t in s.get('tables', [])
+                ]
+            )
+            for s in data['slides']
+        ]
 
         return cls(
             filename=data['filename'],
             total_slides=data['total_slides'],
-            slides=slides
+            slides=slides,
+            file_hash=data.get('file_hash', '')
         )
 
 
@@ -145,11 +205,7 @@ class PPTXProcessor:
         """Process a PowerPoint file and extract all content."""
         prs = Presentation(file_path)
         filename = Path(file_path).name
-        slides = []
-
-        for idx, slide in enumerate(prs.slides, start=1):
-            slide_content = self._extract_slide_content(slide, idx, filename)
-            slides.append(slide_content)
+        slides = self._extract_slides(prs, filename)
 
         return ProcessedPresentation(
             filename=filename,
@@ -159,54 +215,62 @@ class PPTXProcessor:
 
     def process_uploaded_file(self, uploaded_file) -> ProcessedPresentation:
         """Process an uploaded file (Streamlit UploadedFile object)."""
-        # Read the file content
-        file_bytes = uploaded_file.read()
-        uploaded_file.seek(0)  # Reset for potential re-reads
+        # UploadedFile is a BytesIO over the upload's bytes: getvalue() returns
+        # that same bytes object (no copy while no buffer view is held), and
+        # BytesIO(file_bytes) below shares it too
+        return self.process_bytes(uploaded_file.getvalue(), uploaded_file.name)
 
-        # Create presentation from bytes
+    def process_bytes(self, file_bytes: bytes, filename: str) -> ProcessedPresentation:
+        """Process a PowerPoint file from bytes."""
         prs = Presentation(io.BytesIO(file_bytes))
-        filename = uploaded_file.name
-        slides = []
-
-        for idx, slide in enumerate(prs.slides, start=1):
-            slide_content = self._extract_slide_content(slide, idx, filename)
-            slides.append(slide_content)
+        slides = self._extract_slides(prs, filename)
 
         return ProcessedPresentation(
             filename=filename,
             total_slides=len(slides),
-            slides=slides
+            slides=slides,
+            file_hash=hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
         )
 
+    def _extract_slides(self, prs, filename: str) -> List[SlideContent]:
+        """Extract every slide of a presentation, in order."""
+        return [
+            self._extract_slide_content(slide, idx, filename)
+            for idx, slide in enumerate(prs.slides, start=1)
+        ]
+
     def _extract_slide_content(self, slide, slide_number: int, filename: str) -> SlideContent:
-        """Extract all content from a single slide."""
+        """
+        Extract all content from a single slide.
+
+        Works on the slide XML directly: a few compiled XPath queries
+        replace walking slide.shapes, which builds a wrapper object (and
+        parses its subtree) for every shape. Only table frames are
+        materialized as python-pptx shapes.
+        """
         content = SlideContent(slide_number=slide_number)
+        element = slide.element
 
         # Extract title
         if slide.shapes.title:
             content.title = slide.shapes.title.text.strip()
 
-        # Process all shapes
-        for shape in slide.shapes:
-            # Text frames
-            if shape.has_text_frame:
-                for paragraph in shape.text_frame.paragraphs:
-                    text = paragraph.text.strip()
-                    if text and text != content.title:
-                        content.text_content.append(text)
-
-            # Tables
-            if shape.has_table:
-                table_data = self._extract_table(shape.table)
-                content.tables.append(table_data)
+        # Text frames; repeats of the title or of an earlier paragraph
+        # (e.g. the same bullet on a layout and a text box) are dropped
+        seen = {content.title}
+        for paragraph in _SHAPE_PARAGRAPHS(element):
+            text = _paragraph_text(paragraph).strip()
+            if text and text not in seen:
+                seen.add(text)
+                content.text_content.append(text)
 
-            # Charts
-            if shape.shape_type == MSO_SHAPE_TYPE.CHART:
-                content.has_chart = True
+        # Tables
+        for frame in _TABLE_FRAMES(element):
+            content.tables.append(self._extract_table(GraphicFrame(frame, slide.shapes).table))
 
-            # Images/Pictures
-            if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                content.has_image = True
+        # Charts and images/pictures
+        content.has_chart = _HAS_CHART(element)
+        content.has_image = _HAS_PICTURE(element)
 
         # Extract notes
         if slide.has_notes_slide:
@@ -218,12 +282,7 @@ class PPTXProcessor:
 
     def _extract_table(self, table) -> TableData:
         """Extract data from a table shape."""
-        rows = []
-        for row in table.rows:
-            row_data = []
-            for cell in row.cells:
-                row_data.append(cell.text.strip())
-            rows.append(row_data)
+        rows = [[cell.text.strip() for cell in row.cells] for row in table.rows]
 
         # Use first row as headers if it looks like a header
         headers = []
@@ -5,12 +5,19 @@ Handles natural language queries over slide content.
 Combines semantic search with LLM-powered response generation.
 """
 
+import io
 import os
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import numpy as np
 import anthropic
 
-from .embeddings import EmbeddingsService
-from ..utils.helpers import get_api_key
+from .embeddings import EmbeddingsService, QueryCache, SlideHit
+from ..utils.helpers import get_api_key, get_http_client
+
+# Answers kept for repeated or rephrased questions
+ANSWER_CACHE_SIZE = 256
+ANSWER_CACHE_THRESHOLD = float(os.getenv("QUERY_CACHE_THRESHOLD", "0.97"))
 
 
 class QueryEngine:
@@ -27,12 +34,20 @@ class QueryEngine:
         self.api_key = api_key or get_api_key()
 
         if self.api_key:
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            self.client = anthropic.Anthropic(api_key=self.api_key, http_client=get_http_client())
         else:
             self.client = None
 
         self.model = "claude-sonnet-4-20250514"
 
+        # Hits skip both the vector search and the Claude call; chat only
+        # uses it for first turns, whose answer doesn't depend on history
+        self.answer_cache: QueryCache[Dict[str, Any]] = QueryCache(
+            max_size=ANSWER_CACHE_SIZE,
+            sim_threshold=ANSWER_CACHE_THRESHOLD
+        )
+        self._answer_generation = self.embeddings.generation
+
     def query(
         self,
         question: str,
@@ -50,8 +65,16 @@ class QueryEngine:
         Returns:
             Dict with answer, relevant_slides, and confidence
         """
-        # Step 1: Semantic search for relevant slides
-        relevant_slides = self.embeddings.search(question, n_results=n_results)
+        key = QueryCache.make_key(question, n_results, None)
+        cached, embedding = self._cached_answer(key, question)
+        if cached is not None:
+            # Copy so callers (e.g. chat) can overwrite the answer
+            return dict(cached)
+
+        # Step 1: Keyword prefilter + semantic rerank for relevant slides
+        relevant_slides = self.embeddings.hybrid_search(
+            question, n_results=n_results, embedding=embedding
+        )
 
         if not relevant_slides:
             return {
@@ -67,30 +90,53 @@ class QueryEngine:
             # Fallback without LLM
             answer = self._generate_simple_response(question, relevant_slides)
 
-        return {
+        result = {
             "answer": answer,
             "relevant_slides": relevant_slides,
             "confidence": self._calculate_confidence(relevant_slides)
         }
+        self.answer_cache.put(key, embedding, result)
+        return dict(result)
+
+    def _cached_answer(
+        self,
+        key: Tuple[str, int, str],
+        question: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+        """
+        Look a question up in the answer cache.
+
+        Returns:
+            (cached result or None, the question's embedding if it had to
+            be computed for the similarity lookup, for reuse by the search)
+        """
+        # Answers are only valid for the collection they were drawn from
+        if self._answer_generation != self.embeddings.generation:
+            self.answer_cache.clear()
+            self._answer_generation = self.embeddings.generation
+
+        cached = self.answer_cache.get(key)
+        if cached is not None:
+            return cached, None
+        embedding = self.embeddings.embed_queries([question])[0]
+        return self.answer_cache.get_similar(key, embedding), embedding
 
     def _generate_response(
         self,
         question: str,
-        relevant_slides: List[Dict[str, Any]]
+        relevant_slides: List[SlideHit]
     ) -> str:
         """Generate a response using Claude."""
-        # Build context from relevant slides
-        context_parts = []
-        for slide in relevant_slides:
-            metadata = slide.get('metadata', {})
-            slide_num = metadata.get('slide_number', '?')
-            filename = metadata.get('filename', 'Unknown')
+        # Build context from relevant slides in one buffer
+        out = io.StringIO()
+        write = out.write
+        for i, slide in enumerate(relevant_slides):
+            if i:
+                write("\n\n---\n\n")
+            write(f"[Slide {slide.slide_number} from {slide.filename or 'Unknown'}]\n")
+            write(slide.content)
 
-            context_parts.append(
-                f"[Slide {slide_num} from {filename}]\n{slide.get('content', '')}"
-            )
-
-        context = "\n\n---\n\n".join(context_parts)
+        context = out.getvalue()
 
         prompt = f"""You are an intelligent assistant helping users find information from presentation slides.
 
@@ -121,43 +167,35 @@ ANSWER:"""
     def _generate_simple_response(
         self,
         question: str,
-        relevant_slides: List[Dict[str, Any]]
+        relevant_slides: List[SlideHit]
     ) -> str:
         """Generate a simple response without LLM (fallback)."""
-        response_parts = [
-            f"Found {len(relevant_slides)} relevant slide(s) for your query:\n"
-        ]
+        out = io.StringIO()
+        write = out.write
+        write(f"Found {len(relevant_slides)} relevant slide(s) for your query:\n")
 
         for slide in relevant_slides:
-            metadata = slide.get('metadata', {})
-            slide_num = metadata.get('slide_number', '?')
-            title = metadata.get('title', 'Untitled')
-
-            response_parts.append(f"\n**Slide {slide_num}: {title}**")
+            write(f"\n\n**Slide {slide.slide_number}: {slide.title or 'Untitled'}**\n")
 
             # Show preview of content
-            content = slide.get('content', '')
-            if len(content) > 300:
-                content = content[:300] + "..."
-            response_parts.append(content)
+            content = slide.content
+            write(content[:300] + "..." if len(content) > 300 else content)
 
-        return "\n".join(response_parts)
+        return out.getvalue()
 
-    def _calculate_confidence(self, results: List[Dict[str, Any]]) -> float:
+    def _calculate_confidence(self, results: List[SlideHit]) -> float:
         """Calculate confidence score based on search results."""
         if not results:
             return 0.0
 
         # Use inverse of average distance as confidence
-        # ChromaDB returns L2 distance, lower is better
-        distances = [r.get('distance', 1.0) for r in results]
-        avg_distance = sum(distances) / len(distances)
-
-        # Convert to 0-1 confidence score
-        # Typical distances range from 0.5 (very similar) to 2.0 (dissimilar)
-        confidence = max(0.0, min(1.0, 1.0 - (avg_distance / 2.0)))
+        # ChromaDB returns cosine distance (1 - cos_sim), lower is better
+        distances = np.fromiter(
+            (r.distance for r in results), dtype=np.float32, count=len(results)
+        )
 
-        return round(confidence, 2)
+        # Convert to 0-1 confidence score: the mean cosine similarity
+        return round(float(np.clip(1.0 - distances.mean(), 0.0, 1.0)), 2)
 
     def expand_query(self, question: str) -> List[str]:
         """
@@ -167,23 +205,20 @@ ANSWER:"""
         if not self.client:
             return [question]
 
-        prompt = f"""Given this user question about presentation slides, generate 3 alternative search queries that might help find relevant information.
-Return only the queries, one per line.
-
-Question: {question}
-
-Alternative queries:"""
-
         message = self.client.messages.create(
             model=self.model,
             max_tokens=200,
             messages=[
-                {"role": "user", "content": prompt}
+                {"role": "user", "content": _expansion_prompt(question)}
             ]
         )
 
-        alternatives = message.content[0].text.strip().split('\n')
-        return [question] + [q.strip() for q in alternatives if q.strip()]
+        return _parse_expansion(question, message.content[0].text)
+
+    def _example_questions_context(self) -> str:
+        """Sample slide content for the example question prompt."""
+        sample_results = self.embeddings.search("main topics key points data", n_results=5)
+        return "\n---\n".join(slide.content[:300] for slide in sample_results)
 
     def generate_example_questions(self, num_questions: int = 6, lang: str = 'en') -> List[str]:
         """
@@ -200,45 +235,17 @@ Alternative queries:"""
             return []
 
         # Get a sample of slide content to understand the presentation
-        sample_results = self.embeddings.search("main topics key points data", n_results=5)
-
-        if not sample_results:
+        context = self._example_questions_context()
+        if not context:
             return []
 
-        # Build context from sample slides
-        context_parts = []
-        for slide in sample_results:
-            content = slide.get('content', '')[:300]
-            context_parts.append(content)
-
-        context = "\n---\n".join(context_parts)
-
-        lang_instruction = "in Arabic (العربية)" if lang == 'ar' else "in English"
-
-        prompt = f"""Based on this presentation content, generate {num_questions} natural questions that a user might ask {lang_instruction}.
-
-PRESENTATION CONTENT:
-{context}
-
-Generate questions that:
-- Are specific to the actual content shown
-- Cover different aspects (data, summaries, comparisons, specific slides)
-- Sound natural and conversational
-- Would help someone explore the presentation
-
-Return ONLY the questions, one per line, no numbering or bullets."""
-
         try:
             message = self.client.messages.create(
                 model=self.model,
                 max_tokens=500,
-                messages=[{"role": "user", "content": prompt}]
+                messages=[{"role": "user", "content": _example_questions_prompt(context, num_questions, lang)}]
             )
-
-            questions = message.content[0].text.strip().split('\n')
-            # Clean up and filter empty lines
-            questions = [q.strip() for q in questions if q.strip()]
-            return questions[:num_questions]
+            return _parse_questions(message.content[0].text, num_questions)
 
         except Exception:
             return []
@@ -246,7 +253,8 @@ Return ONLY the questions, one per line, no numbering or bullets."""
     def chat(
         self,
         message: str,
-        chat_history: List[Dict[str, str]] = None
+        chat_history: List[Dict[str, str]] = None,
+        summary: str = ""
     ) -> Dict[str, Any]:
         """
         Handle a chat message with conversation context.
@@ -254,36 +262,105 @@ Return ONLY the questions, one per line, no numbering or bullets."""
         Args:
             message: Current user message
             chat_history: List of previous messages [{"role": "user/assistant", "content": "..."}]
+            summary: Short summary of earlier turns no longer in chat_history
 
         Returns:
             Response with answer and relevant slides
         """
-        # Get relevant slides for the current message
-        result = self.query(message, n_results=5)
-
         if not self.client:
-            return result
-
-        # Build conversation with context
-        context_parts = []
-        for slide in result['relevant_slides']:
-            metadata = slide.get('metadata', {})
-            context_parts.append(
-                f"[Slide {metadata.get('slide_number', '?')}] {slide.get('content', '')[:500]}"
-            )
+            return self.query(message, n_results=5)
 
-        system_prompt = f"""You are an intelligent assistant helping users explore and understand presentation slides.
+        key = embedding = None
+        if not chat_history and not summary:
+            key = _chat_cache_key(message)
+            cached, embedding = self._cached_answer(key, message)
+            if cached is not None:
+                return dict(cached)
 
-Available slide content:
-{chr(10).join(context_parts)}
+        result, request = self._chat_request(message, chat_history, summary, embedding)
+        response = self.client.messages.create(**request)
 
-Guidelines:
-- Answer questions based on the slide content above
-- Be conversational and helpful
-- Reference specific slides when relevant
-- If asked about data/charts, describe what's shown
-- If information isn't available, say so politely
-- Keep responses concise but informative"""
+        result['answer'] = response.content[0].text
+        if key is not None:
+            self.answer_cache.put(key, embedding, dict(result))
+        return result
+
+    def chat_stream(
+        self,
+        message: str,
+        chat_history: List[Dict[str, str]] = None,
+        summary: str = ""
+    ) -> Tuple[Dict[str, Any], Iterator[str]]:
+        """
+        Like chat(), but stream the answer as it is generated.
+
+        The slides are retrieved before this returns; the Claude request
+        only starts once the text iterator is consumed (e.g. by
+        st.write_stream), so the first tokens show up without waiting
+        for the whole reply.
+
+        Args:
+            message: Current user message
+            chat_history: List of previous messages (see chat)
+            summary: Short summary of earlier turns no longer in chat_history
+
+        Returns:
+            (result with relevant_slides and confidence, iterator over
+            the answer's text chunks)
+        """
+        if not self.client:
+            result = self.query(message, n_results=5)
+            return result, iter((result['answer'],))
+
+        key = embedding = None
+        if not chat_history and not summary:
+            key = _chat_cache_key(message)
+            cached, embedding = self._cached_answer(key, message)
+            if cached is not None:
+                return dict(cached), iter((cached['answer'],))
+
+        result, request = self._chat_request(message, chat_history, summary, embedding)
+
+        def text_stream() -> Iterator[str]:
+            chunks = []
+            with self.client.messages.stream(**request) as stream:
+                for text in stream.text_stream:
+                    chunks.append(text)
+                    yield text
+            # Only answers that streamed to the end are cached
+            if key is not None:
+                self.answer_cache.put(key, embedding, {**result, "answer": "".join(chunks)})
+
+        return result, text_stream()
+
+    def _chat_request(
+        self,
+        message: str,
+        chat_history: Optional[List[Dict[str, str]]],
+        summary: str,
+        embedding: Optional[np.ndarray] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Retrieve slides for a chat turn and build its messages.create arguments."""
+        # Only the relevant slides are needed: the answer comes from the
+        # conversational call, so query()'s own Claude call is skipped
+        relevant_slides = self.embeddings.hybrid_search(message, n_results=5, embedding=embedding)
+        result = {
+            "answer": "",
+            "relevant_slides": relevant_slides,
+            "confidence": self._calculate_confidence(relevant_slides)
+        }
+
+        # Follow-up turns usually retrieve the same slides, so the prompt
+        # built for them is reused
+        system_prompt = _chat_system_prompt(tuple(slide.chat_snippet for slide in relevant_slides))
+
+        # The slide context is marked for Anthropic's prompt cache, so turns
+        # that retrieve the same slides don't pay to re-read it. The summary
+        # changes every turn and goes in a separate block after the cached prefix.
+        # (Prefixes shorter than the model's minimum are simply not cached.)
+        system = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+        if summary:
+            system.append({"type": "text", "text": f"Earlier in this conversation:\n{summary}"})
 
         # Build messages
         messages = []
@@ -296,12 +373,83 @@ Guidelines:
 
         messages.append({"role": "user", "content": message})
 
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=1500,
-            system=system_prompt,
-            messages=messages
-        )
+        return result, {
+            "model": self.model,
+            "max_tokens": 1500,
+            "system": system,
+            "messages": messages
+        }
 
-        result['answer'] = response.content[0].text
-        return result
+
+def _chat_cache_key(message: str) -> Tuple[str, int, str]:
+    """
+    Answer cache key of a first chat turn.
+
+    Chat answers come from a different prompt than query()'s, so they are
+    kept apart from query()'s entries.
+    """
+    return QueryCache.make_key(message, 5, {"answer": "chat"})
+
+
+@lru_cache(maxsize=64)
+def _chat_system_prompt(snippets: Tuple[str, ...]) -> str:
+    """
+    Build the chat system prompt for the retrieved slides.
+
+    Args:
+        snippets: Each relevant slide's chat snippet (precomputed at ingestion)
+    """
+    context = "\n".join(snippets)
+
+    return f"""You are an intelligent assistant helping users explore and understand presentation slides.
+
+Available slide content:
+{context}
+
+Guidelines:
+- Answer questions based on the slide content above
+- Be conversational and helpful
+- Reference specific slides when relevant
+- If asked about data/charts, describe what's shown
+- If information isn't available, say so politely
+- Keep responses concise but informative"""
+
+
+def _expansion_prompt(question: str) -> str:
+    """Prompt asking for alternative search queries."""
+    return f"""Given this user question about presentation slides, generate 3 alternative search queries that might help find relevant information.
+Return only the queries, one per line.
+
+Question: {question}
+
+Alternative queries:"""
+
+
+def _parse_expansion(question: str, reply: str) -> List[str]:
+    """The original question followed by the non-empty reply lines."""
+    alternatives = reply.strip().split('\n')
+    return [question] + [q.strip() for q in alternatives if q.strip()]
+
+
+def _example_questions_prompt(context: str, num_questions: int, lang: str) -> str:
+    """Prompt asking for example questions about the sampled slides."""
+    lang_instruction = "in Arabic (العربية)" if lang == 'ar' else "in English"
+
+    return f"""Based on this presentation content, generate {num_questions} natural questions that a user might ask {lang_instruction}.
+
+PRESENTATION CONTENT:
+{context}
+
+Generate questions that:
+- Are specific to the actual content shown
+- Cover different aspects (data, summaries, comparisons, specific slides)
+- Sound natural and conversational
+- Would help someone explore the presentation
+
+Return ONLY the questions, one per line, no numbering or bullets."""
+
+
+def _parse_questions(reply: str, num_questions: int) -> List[str]:
+    """Split a reply into at most num_questions non-empty lines."""
+    questions = [q.strip() for q in reply.strip().split('\n') if q.strip()]
+    return questions[:num_questions]
@@ -5,12 +5,29 @@ Uses Claude Vision to analyze slide images and extract
 semantic understanding from charts and graphics.
 """
 
+import asyncio
 import base64
-import os
-from typing import Optional, Dict, Any, List
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 import anthropic
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+
+from ..utils.helpers import get_api_key, get_http_client, new_async_http_client
+
+# Vision requests in flight at once when analyzing a whole deck
+VISION_CONCURRENCY = 5
+
+# Slide image analyses kept per analyzer, keyed by image digest + context
+IMAGE_ANALYSIS_CACHE_SIZE = 128
+
+# The SDK retries rate-limit (429) and overload errors with exponential
+# backoff, honouring the server's retry-after header
+VISION_MAX_RETRIES = 5
 
 
 @dataclass
@@ -38,39 +55,56 @@ class VisionAnalyzer:
     """Analyzes slide images using Claude Vision."""
 
     def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
+        self.api_key = api_key or get_api_key()
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment")
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.client = anthropic.Anthropic(
+            api_key=self.api_key,
+            max_retries=VISION_MAX_RETRIES,
+            http_client=get_http_client()
+        )
         self.model = "claude-sonnet-4-20250514"
 
-    def analyze_slide_image(self, image_base64: str, slide_context: str = "") -> SlideVisualAnalysis:
+        self._image_analyses: "OrderedDict[Tuple[bytes, str], SlideVisualAnalysis]" = OrderedDict()
+        self._image_analyses_lock = threading.Lock()
+
+    def _cached_image_analysis(self, key: Tuple[bytes, str]) -> Optional[SlideVisualAnalysis]:
+        """A copy of a cached analysis (callers may renumber it), or None."""
+        with self._image_analyses_lock:
+            analysis = self._image_analyses.get(key)
+            if analysis is None:
+                return None
+            self._image_analyses.move_to_end(key)
+        return replace(analysis)
+
+    def _store_image_analysis(self, key: Tuple[bytes, str], analysis: SlideVisualAnalysis) -> SlideVisualAnalysis:
+        """Cache an analysis, evicting the least recently used; returns a copy."""
+        with self._image_analyses_lock:
+            self._image_analyses[key] = analysis
+            self._image_analyses.move_to_end(key)
+            while len(self._image_analyses) > IMAGE_ANALYSIS_CACHE_SIZE:
+                self._image_analyses.popitem(last=False)
+        return replace(analysis)
+
+    def new_async_client(self) -> anthropic.AsyncAnthropic:
         """
-        Analyze a slide image to extract visual information.
+        A fresh async client for the *_async methods.
 
-        Args:
-            image_base64: Base64 encoded image
-            slide_context: Optional text context from the slide
+        Its connection pool is bound to the event loop it first runs on,
+        so create one per loop (e.g. per asyncio.run) and close it there.
         """
-        prompt = f"""Analyze this presentation slide image.
-
-{f"Context from slide text: {slide_context}" if slide_context else ""}
-
-Please provide:
-1. A description of what visual elements are present (charts, diagrams, images)
-2. For any charts/graphs:
-   - Chart type (bar, line, pie, scatter, etc.)
-   - What data it represents
-   - Key data points you can extract (approximate values are fine)
-   - Trends or patterns visible
-3. Key insights or takeaways from the visual content
-
-Respond in a structured format."""
+        return anthropic.AsyncAnthropic(
+            api_key=self.api_key,
+            max_retries=VISION_MAX_RETRIES,
+            http_client=new_async_http_client()
+        )
 
-        message = self.client.messages.create(
-            model=self.model,
-            max_tokens=1500,
-            messages=[
+    def _image_request(self, image_base64: str, prompt: str) -> Dict[str, Any]:
+        """messages.create arguments for a prompt about one PNG image."""
+        return {
+            "model": self.model,
+            "max_tokens": 1500,
+            "messages": [
                 {
                     "role": "user",
                     "content": [
@@ -80,7 +114,11 @@ Respond in a structured format."""
                                 "type": "base64",
                                 "media_type": "image/png",
                                 "data": image_base64
-                            }
+                            },
+                            # Follow-up prompts about the same image (e.g.
+                            # extract_chart_data after analyze_slide_image)
+                            # read it from Anthropic's prompt cache
+                            "cache_control": {"type": "ephemeral"}
                         },
                         {
                             "type": "text",
@@ -89,12 +127,92 @@ Respond in a structured format."""
                     ]
                 }
             ]
-        )
+        }
+
+    def analyze_slide_image(self, image_base64: str, slide_context: str = "") -> SlideVisualAnalysis:
+        """
+        Analyze a slide image to extract visual information.
+
+        Args:
+            image_base64: Base64 encoded image
+            slide_context: Optional text context from the slide
+        """
+        key = _image_key(image_base64, slide_context)
+        cached = self._cached_image_analysis(key)
+        if cached is not None:
+            return cached
 
-        response_text = message.content[0].text
+        message = self.client.messages.create(
+            **self._image_request(image_base64, _image_prompt(slide_context))
+        )
 
         # Parse the response into structured data
-        return self._parse_analysis(response_text, 0)
+        return self._store_image_analysis(key, self._parse_analysis(message.content[0].text, 0))
+
+    async def analyze_slide_image_async(
+        self,
+        image_base64: str,
+        slide_context: str = "",
+        *,
+        client: anthropic.AsyncAnthropic
+    ) -> SlideVisualAnalysis:
+        """
+        Async version of analyze_slide_image.
+
+        Args:
+            image_base64: Base64 encoded image
+            slide_context: Optional text context from the slide
+            client: Async client from new_async_client, on the running loop
+        """
+        key = _image_key(image_base64, slide_context)
+        cached = self._cached_image_analysis(key)
+        if cached is not None:
+            return cached
+
+        message = await client.messages.create(
+            **self._image_request(image_base64, _image_prompt(slide_context))
+        )
+        return self._store_image_analysis(key, self._parse_analysis(message.content[0].text, 0))
+
+    def analyze_slide_images(
+        self,
+        slides: List[Tuple[str, str]],
+        concurrency: int = VISION_CONCURRENCY
+    ) -> List[SlideVisualAnalysis]:
+        """
+        Analyze a deck's slide images concurrently.
+
+        Wall time is bounded by the concurrency limit rather than the sum
+        of every request's latency.
+
+        Args:
+            slides: (image_base64, slide_context) per slide
+            concurrency: Maximum requests in flight
+
+        Returns:
+            One analysis per slide, in order, numbered from 1
+        """
+        analyses = asyncio.run(self._analyze_images(slides, concurrency))
+        for number, analysis in enumerate(analyses, start=1):
+            analysis.slide_number = number
+        return analyses
+
+    async def _analyze_images(
+        self,
+        slides: List[Tuple[str, str]],
+        concurrency: int
+    ) -> List[SlideVisualAnalysis]:
+        """Gather analyze_slide_image_async over slides under a semaphore."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        # A client per event loop: asyncio.run closes the loop, and pooled
+        # connections can't be reused from the next one
+        async with self.new_async_client() as client:
+            async def analyze(image_base64: str, slide_context: str) -> SlideVisualAnalysis:
+                async with semaphore:
+                    return await self.analyze_slide_image_async(image_base64, slide_context, client=client)
+
+            return await asyncio.gather(*(analyze(image, context) for image, context in slides))
 
     def analyze_slide_content(
         self,
@@ -113,47 +231,41 @@ Respond in a structured format."""
             has_image: Whether the slide contains images
             tables: List of table markdowns
         """
-        context_parts = [f"Slide text content:\n{text_content}"]
-
-        if tables:
-            context_parts.append("Tables found in slide:")
-            context_parts.extend(tables)
-
-        if has_chart:
-            context_parts.append("Note: This slide contains one or more charts/graphs.")
-
-        if has_image:
-            context_parts.append("Note: This slide contains images/pictures.")
-
-        prompt = f"""Analyze this presentation slide content and provide a structured summary.
-
-{chr(10).join(context_parts)}
-
-Please provide:
-1. Main topic/theme of the slide
-2. Key points or data presented
-3. If tables are present, summarize the key findings
-4. Any insights that can be derived from the content
+        message = self.client.messages.create(
+            model=self.model,
+            max_tokens=1000,
+            messages=[
+                {
+                    "role": "user",
+                    "content": _content_prompt(text_content, has_chart, has_image, tables)
+                }
+            ]
+        )
 
-Be concise but thorough."""
+        return _content_result(message.content[0].text, has_chart, has_image, tables)
 
-        message = self.client.messages.create(
+    async def analyze_slide_content_async(
+        self,
+        text_content: str,
+        has_chart: bool = False,
+        has_image: bool = False,
+        tables: List[str] = None,
+        *,
+        client: anthropic.AsyncAnthropic
+    ) -> Dict[str, Any]:
+        """Async version of analyze_slide_content; client as for analyze_slide_image_async."""
+        message = await client.messages.create(
             model=self.model,
             max_tokens=1000,
             messages=[
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": _content_prompt(text_content, has_chart, has_image, tables)
                 }
             ]
         )
 
-        return {
-            "analysis": message.content[0].text,
-            "has_chart": has_chart,
-            "has_image": has_image,
-            "table_count": len(tables) if tables else 0
-        }
+        return _content_result(message.content[0].text, has_chart, has_image, tables)
 
     def extract_chart_data(self, image_base64: str, chart_description: str = "") -> Dict[str, Any]:
         """
@@ -163,43 +275,25 @@ Be concise but thorough."""
             image_base64: Base64 encoded chart image
             chart_description: Optional description of what the chart shows
         """
-        prompt = f"""This image contains a chart/graph.
-{f"Description: {chart_description}" if chart_description else ""}
-
-Please extract the data shown in this chart as accurately as possible.
-Provide the output as structured data that could be used to recreate the chart:
-
-1. Chart type
-2. X-axis label and values
-3. Y-axis label and range
-4. Data series (name and values)
-5. Any legends or categories
+        message = self.client.messages.create(
+            **self._image_request(image_base64, _chart_prompt(chart_description))
+        )
 
-Format the data points as a list that could be converted to JSON.
-If exact values aren't clear, provide your best estimates with a note about uncertainty."""
+        return {
+            "raw_extraction": message.content[0].text,
+            "chart_description": chart_description
+        }
 
-        message = self.client.messages.create(
-            model=self.model,
-            max_tokens=1500,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/png",
-                                "data": image_base64
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": prompt
-                        }
-                    ]
-                }
-            ]
+    async def extract_chart_data_async(
+        self,
+        image_base64: str,
+        chart_description: str = "",
+        *,
+        client: anthropic.AsyncAnthropic
+    ) -> Dict[str, Any]:
+        """Async version of extract_chart_data; client as for analyze_slide_image_async."""
+        message = await client.messages.create(
+            **self._image_request(image_base64, _chart_prompt(chart_description))
         )
 
         return {
@@ -207,14 +301,38 @@ If exact values aren't clear, provide your best estimates with a note about unce
             "chart_description": chart_description
         }
 
-    def _parse_analysis(self, response_text: str, slide_number: int) -> SlideVisualAnalysis:
-        """Parse Claude's response into structured analysis."""
-        # For now, return the raw analysis
-        # In production, you'd parse this more carefully
+    def _parse_analysis(
+        self,
+        response_text: str,
+        slide_number: int,
+        max_charts: Optional[int] = None
+    ) -> SlideVisualAnalysis:
+        """
+        Parse Claude's response into structured analysis.
+
+        The prose before the trailing JSON block becomes the visual
+        description; the block's "charts" become ChartAnalysis entries.
+        A reply without a usable block keeps its full text and no charts.
+
+        Args:
+            response_text: Reply to an _image_prompt request
+            slide_number: Slide the image belongs to
+            max_charts: Stop parsing after this many charts
+        """
+        match = _JSON_BLOCK.search(response_text)
+        charts: List[ChartAnalysis] = []
+        description = response_text
+        if match:
+            try:
+                charts = _parse_charts(match.group(1), max_charts)
+                description = response_text[:match.start()].rstrip()
+            except ValueError:
+                charts = []
+
         return SlideVisualAnalysis(
             slide_number=slide_number,
-            visual_description=response_text,
-            charts=[],
+            visual_description=description,
+            charts=charts,
             extracted_data={},
             confidence=0.8
         )
@@ -229,8 +347,12 @@ If exact values aren't clear, provide your best estimates with a note about unce
         if slide_content.get('title'):
             parts.append(f"Slide Title: {slide_content['title']}")
 
-        if slide_content.get('text_content'):
-            parts.append(f"Content: {' '.join(slide_content['text_content'])}")
+        # SlideContent.to_dict() provides the text already joined
+        text = slide_content.get('text_joined')
+        if text is None and slide_content.get('text_content'):
+            text = ' '.join(slide_content['text_content'])
+        if text:
+            parts.append(f"Content: {text}")
 
         if slide_content.get('tables'):
             parts.append("Contains tabular data")
@@ -242,3 +364,117 @@ If exact values aren't clear, provide your best estimates with a note about unce
             parts.append(f"Analysis: {slide_content['analysis']}")
 
         return " | ".join(parts)
+
+
+# Trailing fenced JSON block of an _image_prompt reply
+_JSON_BLOCK = re.compile(r"```json\s*(\{.*\})\s*```\s*$", re.DOTALL)
+
+
+def _parse_charts(block: str, max_charts: Optional[int]) -> List[ChartAnalysis]:
+    """Build ChartAnalysis entries from the "charts" array of a JSON block."""
+    charts = []
+    for item in json.loads(block).get('charts') or ():
+        if max_charts is not None and len(charts) >= max_charts:
+            break
+        if not isinstance(item, dict):
+            continue
+        charts.append(ChartAnalysis(
+            chart_type=str(item.get('chart_type', '')),
+            title=str(item.get('title', '')),
+            description=str(item.get('description', '')),
+            data_points=list(item.get('data_points') or []),
+            trends=list(item.get('trends') or []),
+            key_insights=list(item.get('key_insights') or [])
+        ))
+    return charts
+
+
+def _image_key(image_base64: str, slide_context: str) -> Tuple[bytes, str]:
+    """Analysis cache key: the image's digest and the context it was asked with."""
+    return hashlib.blake2b(image_base64.encode('ascii'), digest_size=16).digest(), slide_context
+
+
+def _content_prompt(
+    text_content: str,
+    has_chart: bool = False,
+    has_image: bool = False,
+    tables: List[str] = None
+) -> str:
+    """Prompt for the text-based analysis of one slide."""
+    context_parts = [f"Slide text content:\n{text_content}"]
+
+    if tables:
+        context_parts.append("Tables found in slide:")
+        context_parts.extend(tables)
+
+    if has_chart:
+        context_parts.append("Note: This slide contains one or more charts/graphs.")
+
+    if has_image:
+        context_parts.append("Note: This slide contains images/pictures.")
+
+    return f"""Analyze this presentation slide content and provide a structured summary.
+
+{chr(10).join(context_parts)}
+
+Please provide:
+1. Main topic/theme of the slide
+2. Key points or data presented
+3. If tables are present, summarize the key findings
+4. Any insights that can be derived from the content
+
+Be concise but thorough."""
+
+
+def _content_result(
+    analysis: str,
+    has_chart: bool,
+    has_image: bool,
+    tables: Optional[List[str]]
+) -> Dict[str, Any]:
+    """Package a text-based analysis reply."""
+    return {
+        "analysis": analysis,
+        "has_chart": has_chart,
+        "has_image": has_image,
+        "table_count": len(tables) if tables else 0
+    }
+
+
+def _image_prompt(slide_context: str) -> str:
+    """Prompt for the visual analysis of one slide image."""
+    return f"""Analyze this presentation slide image.
+
+{f"Context from slide text: {slide_context}" if slide_context else ""}
+
+Please provide:
+1. A description of what visual elements are present (charts, diagrams, images)
+2. For any charts/graphs:
+   - Chart type (bar, line, pie, scatter, etc.)
+   - What data it represents
+   - Key data points you can extract (approximate values are fine)
+   - Trends or patterns visible
+3. Key insights or takeaways from the visual content
+
+Write the analysis as prose, then end with a ```json block holding
+{{"charts": [{{"chart_type": "...", "title": "...", "description": "...",
+"data_points": [{{"label": "...", "value": 0}}], "trends": ["..."],
+"key_insights": ["..."]}}]}} with one entry per chart ([] if there are none)."""
+
+
+def _chart_prompt(chart_description: str) -> str:
+    """Prompt for extracting the data behind a chart image."""
+    return f"""This image contains a chart/graph.
+{f"Description: {chart_description}" if chart_description else ""}
+
+Please extract the data shown in this chart as accurately as possible.
+Provide the output as structured data that could be used to recreate the chart:
+
+1. Chart type
+2. X-axis label and values
+3. Y-axis label and range
+4. Data series (name and values)
+5. Any legends or categories
+
+Format the data points as a list that could be converted to JSON.
+If exact values aren't clear, provide your best estimates with a note about uncertainty."""
@@ -4,7 +4,11 @@ Translations Module
 Provides bilingual support for English and Arabic.
 """
 
-TRANSLATIONS = {
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping
+
+_TRANSLATIONS = {
     'en': {
         # App Header
         'app_title': 'Data Dashboard',
@@ -37,6 +41,7 @@ TRANSLATIONS = {
         'upload_loaded': 'Currently loaded: {filename}',
         'upload_error': 'Error processing file: {error}',
         'processing': 'Processing presentation...',
+        'processing_progress': 'Embedded {done}/{total}',
 
         # File Info
         'file_overview': 'Presentation Overview',
@@ -114,6 +119,7 @@ TRANSLATIONS = {
         'upload_loaded': 'محمّل حالياً: {filename}',
         'upload_error': 'خطأ في معالجة الملف: {error}',
         'processing': 'جاري معالجة العرض التقديمي...',
+        'processing_progress': 'تمت فهرسة {done}/{total}',
 
         # File Info
         'file_overview': 'نظرة عامة على العرض',
@@ -161,7 +167,14 @@ TRANSLATIONS = {
     }
 }
 
+# Read-only views: get_text memoizes lookups, which is only sound while
+# the strings can't change underneath it
+TRANSLATIONS = MappingProxyType({
+    lang: MappingProxyType(table) for lang, table in _TRANSLATIONS.items()
+})
+
 
+@lru_cache(maxsize=4096)
 def get_text(key: str, lang: str = 'en') -> str:
     """
     Get translated text for a given key.
@@ -174,3 +187,50 @@ def get_text(key: str, lang: str = 'en') -> str:
         Translated string or key if not found
     """
     return TRANSLATIONS.get(lang, TRANSLATIONS['en']).get(key, key)
+
+
+class _TranslationTable(dict):
+    """Translation dict that falls back to the key, like get_text."""
+
+    def __missing__(self, key: str) -> str:
+        return key
+
+
+# Resolved tables for every language, built once at import and shared by
+# every caller, so they are handed out read-only
+_TABLES = {
+    lang: MappingProxyType(_TranslationTable(table))
+    for lang, table in TRANSLATIONS.items()
+}
+
+
+def get_translations(lang: str = 'en') -> Mapping[str, str]:
+    """
+    Get the full translation table for a language.
+
+    Lets render functions do plain dict lookups instead of one
+    get_text call per string.
+
+    Args:
+        lang: Language code ('en' or 'ar')
+
+    Returns:
+        Read-only mapping of key -> translated string; unknown keys map
+        to themselves
+    """
+    return _TABLES.get(lang) or _TABLES['en']
+
+
+def get_texts(keys: Iterable[str], lang: str = 'en') -> Dict[str, str]:
+    """
+    Resolve several translation keys in one call.
+
+    Args:
+        keys: Translation keys
+        lang: Language code ('en' or 'ar')
+
+    Returns:
+        Dict of key -> translated string (unknown keys map to themselves)
+    """
+    table = get_translations(lang)
+    return {key: table[key] for key in keys}